@@ -1,3 +1,4 @@
+import functools
 import os
 import sys
 from pathlib import Path
@@ -5,6 +6,13 @@ from typing import Optional
 import tomllib
 
 
+@functools.lru_cache(maxsize=None)
+def _load_raw_config(config_file: str) -> dict:
+    """按路径缓存 TOML 解析结果，重复构造 Settings 时不再读盘解析"""
+    with open(config_file, "rb") as f:
+        return tomllib.load(f)
+
+
 class Settings:
     """配置管理器：TOML + 路径验证"""
 
@@ -30,8 +38,7 @@ class Settings:
             )
 
         # 2. 加载TOML
-        with open(self.config_file, "rb") as f:
-            raw_config = tomllib.load(f)
+        raw_config = _load_raw_config(str(self.config_file.resolve()))
 
         # 3. 解析为属性 + 路径标准化
         self._parse_config(raw_config)
@@ -57,6 +64,16 @@ class Settings:
         # 业务参数
         self.ocr_use_gpu: bool = config.get("ocr", {}).get("use_gpu", True)
         self.ocr_gpu_id: int = config.get("ocr", {}).get("gpu_id", 0)
+        self.ocr_persistent: bool = config.get("ocr", {}).get("persistent", False)
+        self.ocr_workers: int = config.get("ocr", {}).get("workers", 1)
+        self.ocr_max_concurrency: int = config.get("ocr", {}).get("max_concurrency", 2)
+        self.ocr_max_retries: int = config.get("ocr", {}).get("max_retries", 3)
+
+        # OCR 命令的固定部分，get_ocr_command 只需拼接输入输出参数
+        self._ocr_cmd_prefix: list = [self.ocr_python, self.ocr_script]
+        self._ocr_cmd_suffix: list = (
+            ["--gpu", "--gpu-id", str(self.ocr_gpu_id)] if self.ocr_use_gpu else []
+        )
 
         llm_config = config.get("llm", {})
         self.llm_table_prompt: str = str(
@@ -72,6 +89,12 @@ class Settings:
         self.llm_report_prompt: str = str(
             (project_root / llm_config.get("report_prompt", "")).resolve())
 
+        cache_config = config.get("cache", {})
+        self.cache_enabled: bool = cache_config.get("enabled", False)
+        self.cache_semantic_threshold: float = cache_config.get("semantic_threshold", 0.98)
+        self.cache_max_size: int = cache_config.get("max_size", 512)
+        self.cache_ttl_seconds: float = cache_config.get("ttl_seconds", 600)
+
     def _validate_paths(self):
         """关键路径存在性校验"""
         if not self.ocr_python:
@@ -90,12 +113,10 @@ class Settings:
     def get_ocr_command(self, image_path: str, output_path: str) -> list:
         """生成跨环境调用命令（llm.py中直接使用）"""
         return [
-            self.ocr_python,
-            str(self.ocr_script),
+            *self._ocr_cmd_prefix,
             "--image", str(image_path),
             "--output", str(output_path),
-            "--gpu" if self.use_gpu else "--cpu",
-            f"--gpu-id={self.gpu_id}" if self.use_gpu else ""
+            *self._ocr_cmd_suffix,
         ]
 
 
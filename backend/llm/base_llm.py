@@ -2,9 +2,14 @@
 LLM 服务基类 - 提供通用的 LLM 调用功能
 """
 
+import hashlib
 import os
+import threading
 import tomllib
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Union
 
 from openai import OpenAI
 
@@ -12,16 +17,30 @@ from backend.config import settings
 from .utils import safe_json_parse
 
 
+@lru_cache(maxsize=None)
+def _get_client(base_url: str, api_key: str) -> OpenAI:
+    """同一服务地址共用一个 OpenAI 客户端，复用 HTTP 连接池与 keep-alive 连接"""
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
 class BaseLLM:
     """LLM 服务基类，提供通用的初始化和 Prompt 加载功能"""
 
+    # 批量调用时同时在途的最大请求数
+    max_concurrency: int = 8
+    # 输出为 JSON 对象的子类置为 True，由 vLLM 约束解码保证输出合法 JSON
+    json_mode: bool = False
+    # 相同输入的响应缓存条数，0 为不缓存；仅对贪心解码（输出确定）的子类开启
+    response_cache_size: int = 0
+
     def __init__(
         self,
         prompt_path: str,
         base_url: str = "http://localhost:8000/v1",
         api_key: str = "EMPTY",
         model: str = "Qwen3.5-4B",
-        enable_thinking: bool = False
+        enable_thinking: bool = False,
+        greedy: bool = False
     ):
         """
         初始化 LLM 服务
@@ -31,14 +50,13 @@ class BaseLLM:
             base_url: vLLM API地址
             api_key: API密钥（vLLM默认为EMPTY）
             model: 模型名称
+            enable_thinking: 是否开启思考模式
+            greedy: 是否使用贪心解码（结构化抽取任务，输出确定可复现）
         """
         self.prompt_path = prompt_path
         self._prompt = None
 
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        self.client = _get_client(base_url, api_key)
         self.model = model
 
         # 采样参数配置
@@ -62,6 +80,19 @@ class BaseLLM:
             }
         }
 
+        if greedy:
+            # temperature=0 即贪心解码，top_p/top_k 不再生效
+            self.sampling_params["temperature"] = 0.0
+            self.sampling_params.pop("top_p")
+            self.sampling_params["extra_body"].pop("top_k")
+
+        if self.json_mode:
+            self.sampling_params["response_format"] = {"type": "json_object"}
+
+        # 响应 LRU 缓存：key 为 prompt 内容摘要，value 为 LLM 返回文本
+        self._response_cache: OrderedDict[str, str] = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+
     def _load_prompt(self) -> str:
         """
         从 TOML 文件加载并构建 Prompt
@@ -82,35 +113,35 @@ class BaseLLM:
             except tomllib.TOMLDecodeError as e:
                 raise ValueError(f"TOML文件格式不合法: {self.prompt_path}: {e}")
 
-            prompt = raw_prompt.get("prompt", {}).get("role", "") + "\n\n"
+            # 各段收集到列表中，最后一次性拼接
+            parts = [raw_prompt.get("prompt", {}).get("role", ""), "\n\n"]
 
             if 'rules' in raw_prompt:
-                prompt += "规则：\n"
-                for key, rule in raw_prompt["rules"].items():
-                    prompt += f"{key}：{rule}\n"
-                prompt += "\n"
+                parts.append("规则：\n")
+                parts.extend(f"{key}：{rule}\n" for key, rule in raw_prompt["rules"].items())
+                parts.append("\n")
 
             if 'output' in raw_prompt:
-                prompt += "输出格式：\n"
-                prompt += raw_prompt.get("title", "") + "\n"
-                prompt += raw_prompt.get("description", "") + "\n\n"
+                parts.append("输出格式：\n")
+                parts.append(raw_prompt.get("title", "") + "\n")
+                parts.append(raw_prompt.get("description", "") + "\n\n")
 
             if 'format' in raw_prompt:
-                prompt += "输出格式：\n"
-                prompt += raw_prompt.get("format", "") + "\n\n"
+                parts.append("输出格式：\n")
+                parts.append(raw_prompt.get("format", "") + "\n\n")
 
             if 'examples' in raw_prompt:
-                prompt += "以下为若干个示例，涵盖绝大部分特殊情况处理方式：\n"
+                parts.append("以下为若干个示例，涵盖绝大部分特殊情况处理方式：\n")
                 for key, example in raw_prompt["examples"].items():
-                    prompt += f"例子{key} - {example.get('title', '')}\n"
-                    prompt += "输入：\n"
-                    prompt += example.get("input", "") + "\n"
-                    prompt += "输出：\n"
-                    prompt += example.get("output", "") + "\n\n"
+                    parts.append(f"例子{key} - {example.get('title', '')}\n")
+                    parts.append("输入：\n")
+                    parts.append(example.get("input", "") + "\n")
+                    parts.append("输出：\n")
+                    parts.append(example.get("output", "") + "\n\n")
 
-            prompt += raw_prompt.get("task", {}).get("instruction", "")
-            prompt += "\n\n"
-            self._prompt = prompt
+            parts.append(raw_prompt.get("task", {}).get("instruction", ""))
+            parts.append("\n\n")
+            self._prompt = "".join(parts)
 
         return self._prompt
 
@@ -132,6 +163,19 @@ class BaseLLM:
         Raises:
             RuntimeError: API 调用失败
         """
+        cache_key = None
+        if self.response_cache_size > 0:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(system_content.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(user_content.encode("utf-8"))
+            cache_key = digest.hexdigest()
+            with self._response_cache_lock:
+                cached = self._response_cache.get(cache_key)
+                if cached is not None:
+                    self._response_cache.move_to_end(cache_key)
+                    return cached
+
         messages = [
             {"role": "system", "content": system_content},
             {"role": "user", "content": user_content}
@@ -143,10 +187,30 @@ class BaseLLM:
                 messages=messages,
                 **self.sampling_params
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
         except Exception as e:
             raise RuntimeError(f"API调用失败: {str(e)}")
 
+        if cache_key is not None and content:
+            with self._response_cache_lock:
+                self._response_cache[cache_key] = content
+                if len(self._response_cache) > self.response_cache_size:
+                    self._response_cache.popitem(last=False)
+
+        return content
+
+    def _map_concurrent(self, fn: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """
+        并发调用 fn 处理 items，结果顺序与输入一致
+
+        并发请求到达 vLLM 后由 continuous batching 合并为同一批次解码，
+        整体耗时接近单条请求而非逐条累加
+        """
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(len(items), self.max_concurrency)) as pool:
+            return list(pool.map(fn, items))
+
     def _parse_json_response(self, content: str) -> Union[Dict, List, None]:
         """
         解析 LLM 返回的 JSON 响应
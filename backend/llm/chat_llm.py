@@ -4,7 +4,7 @@ ChatLLM — vLLM 对话客户端
 """
 
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 from openai import OpenAI
 
@@ -46,16 +46,46 @@ class ChatLLM(BaseLLM):
         )
         return response.choices[0].message.content or ""
 
-    def invoke(self, prompt_value: Any) -> str:
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
         """
-        LangChain Runnable 协议入口
-        接收 ChatPromptTemplate 生成的 prompt_value，提取 messages 后调用 vLLM
+        流式调用 chat completion，逐段产出回复文本
+
+        Args:
+            messages: 同 chat()
+
+        Yields:
+            LLM 回复文本增量（思考内容不输出）
         """
-        messages = [
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **self.sampling_params,
+        )
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    @staticmethod
+    def _to_messages(prompt_value: Any) -> List[Dict[str, str]]:
+        return [
             {"role": m.type, "content": m.content}
             for m in prompt_value.to_messages()
         ]
-        return self.chat(messages)
+
+    def invoke(self, prompt_value: Any) -> str:
+        """
+        LangChain Runnable 协议入口
+        接收 ChatPromptTemplate 生成的 prompt_value，提取 messages 后调用 vLLM
+        """
+        return self.chat(self._to_messages(prompt_value))
+
+    def stream_invoke(self, prompt_value: Any) -> Iterator[str]:
+        """invoke 的流式版本"""
+        return self.stream(self._to_messages(prompt_value))
 
 
 # ===== 模块级单例 =====
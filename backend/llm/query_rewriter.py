@@ -14,6 +14,8 @@ from .utils import safe_json_parse
 class QueryRewriter(BaseLLM):
     """查询改写器：去口语化 + 判断是否需要报告/RAG + 联想检验指标"""
 
+    json_mode = True
+
     def __init__(
         self,
         prompt_path: str,
@@ -21,6 +23,7 @@ class QueryRewriter(BaseLLM):
         api_key: str = "EMPTY",
         model: str = "Qwen3.5-4B",
         enable_thinking: bool = False,
+        greedy: bool = False,
     ):
         super().__init__(
             prompt_path=prompt_path,
@@ -28,6 +31,7 @@ class QueryRewriter(BaseLLM):
             api_key=api_key,
             model=model,
             enable_thinking=enable_thinking,
+            greedy=greedy,
         )
 
     def rewrite(self, query: str) -> Dict[str, Any]:
@@ -81,6 +85,7 @@ def get_query_rewriter() -> QueryRewriter:
             base_url=base_url,
             api_key=api_key,
             model="Qwen3.5-4B",
+            greedy=True,
         )
     return _query_rewriter
 
@@ -2,9 +2,16 @@
 
 # vLLM 启动脚本
 # 使用配置文件启动API服务
+#
+# 可选环境变量：
+#   VLLM_MODEL         覆盖 config.yaml 中的模型路径（如预量化的 AWQ 权重目录）
+#   VLLM_QUANTIZATION  量化方式（如 awq、fp8），需与 VLLM_MODEL 指向的权重匹配
+#
+# 示例：VLLM_MODEL=/root/autodl-tmp/models/Qwen/Qwen3.5-4B-AWQ VLLM_QUANTIZATION=awq ./start_server.sh
+#       FP8（Ada/Hopper）：VLLM_QUANTIZATION=fp8 ./start_server.sh
 
 # 配置文件夹路径
-CONFIG_FILE="$(dirname "\$0")/config.yaml"
+CONFIG_FILE="$(dirname "$0")/config.yaml"
 
 # 检查配置文件是否存在
 if [ ! -f "$CONFIG_FILE" ]; then
@@ -12,8 +19,17 @@ if [ ! -f "$CONFIG_FILE" ]; then
     exit 1
 fi
 
+# 命令行参数优先于配置文件，served-model-name 不变，客户端无需修改
+EXTRA_ARGS=()
+if [ -n "$VLLM_MODEL" ]; then
+    EXTRA_ARGS+=(--model "$VLLM_MODEL")
+fi
+if [ -n "$VLLM_QUANTIZATION" ]; then
+    EXTRA_ARGS+=(--quantization "$VLLM_QUANTIZATION")
+fi
+
 echo "使用配置文件: $CONFIG_FILE"
 echo "启动vLLM服务..."
 
 # 启动vLLM服务
-VLLM_USE_MODELSCOPE=true vllm serve --config "$CONFIG_FILE"
\ No newline at end of file
+VLLM_USE_MODELSCOPE=true vllm serve --config "$CONFIG_FILE" "${EXTRA_ARGS[@]}"
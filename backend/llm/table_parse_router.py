@@ -11,7 +11,12 @@ class TableType(str, enum.Enum):
     other = "其它"
 
 
+_TYPE_VALUES = frozenset(t.value for t in TableType)
+
+
 class TableParseRouter(BaseLLM):
+    json_mode = True
+
     def __init__(
         self,
         prompt_path,
@@ -64,33 +69,50 @@ class TableParseRouter(BaseLLM):
             # f"【HTML源码】:\n{html_content}"
         )
 
-        # 调用 LLM
-        times = 3
-        while (times > 0):
+        # 调用 LLM；answer 为类型字符串列表，含合法类型即停止重试
+        answers = []
+        for _ in range(3):
             content = self._call_llm(prompt, user_content)
 
             # 解析 JSON
             parsed_result = self._parse_json_response(content)
-
-            answer_val = parsed_result.get("answer")
-            if answer_val and answer_val in [t.value for t in TableType]:
+            if not isinstance(parsed_result, dict):
+                continue
+
+            # answer 应为字符串列表；单个字符串包成列表，其他类型（dict/数字等）及非字符串元素一律丢弃
+            answers = parsed_result.get("answer") or []
+            if isinstance(answers, str):
+                answers = [answers]
+            elif not isinstance(answers, list):
+                answers = []
+            answers = [res for res in answers if isinstance(res, str)]
+            if any(res in _TYPE_VALUES for res in answers):
                 break
 
-            times -= 1
-
         # 尝试将字符串转换为枚举对象
-        if parsed_result and parsed_result.get("answer"):
-            type_results = []
-            for res in parsed_result["answer"]:
-                try:
-                    type_results.append(TableType(res))
-                except ValueError:
-                    # 如果 LLM 抽风返回了不在定义里的值，捕获异常并兜底
-                    if TableType.other not in type_results:
-                        type_results.append(TableType.other)
-        
-        return type_results if type_results else TableType.other
+        type_results = []
+        for res in answers:
+            try:
+                table_type = TableType(res)
+            except ValueError:
+                # 如果 LLM 抽风返回了不在定义里的值，兜底为 other
+                table_type = TableType.other
+            if table_type not in type_results:
+                type_results.append(table_type)
+
+        return type_results if type_results else [TableType.other]
+
+    def router_batch(self, tables: list[dict]) -> list[list[TableType]]:
+        """
+        批量分类表格类型，并发提交请求由 vLLM 合并批处理
+
+        Args:
+            tables: 表格列表，同 router 的 table_data
 
+        Returns:
+            与输入顺序一致的类型列表
+        """
+        return self._map_concurrent(self.router, tables)
 
 # 获取环境变量
 base_url = os.getenv("OPENAI_BASE_URL", "http://localhost:8000/v1")
@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Union
 
 from backend.config import settings
 from .base_llm import BaseLLM
@@ -7,13 +7,18 @@ from .utils import medical_term_normalizer, safe_json_parse
 
 
 class TableParserLLM(BaseLLM):
+    json_mode = True
+    # 同一模板的报告会重复出现相同表格，相同输入直接复用解析结果
+    response_cache_size = 1024
+
     def __init__(
         self,
         prompt_path,
         base_url: str = "http://localhost:8000/v1",
         api_key: str = "EMPTY",
         model: str = "Qwen3.5-4B",
-        enable_thinking: bool = False
+        enable_thinking: bool = False,
+        greedy: bool = False
     ):
         """
         初始化客户端
@@ -28,7 +33,8 @@ class TableParserLLM(BaseLLM):
             base_url=base_url,
             api_key=api_key,
             model=model,
-            enable_thinking=enable_thinking
+            enable_thinking=enable_thinking,
+            greedy=greedy
         )
         self.normalizer = medical_term_normalizer
 
@@ -105,6 +111,26 @@ class TableParserLLM(BaseLLM):
 
         return parsed_result
 
+    def parse_batch(self, tables: List[dict]) -> List[Union[list, None]]:
+        """
+        批量解析多个表格，请求并发提交给 vLLM
+
+        Args:
+            tables: 表格列表，格式同 parse()
+
+        Returns:
+            与输入顺序一致的解析结果列表，解析失败的表格为 None
+        """
+        return self._map_concurrent(self._parse_or_none, tables)
+
+    def _parse_or_none(self, table_data: dict) -> Union[list, None]:
+        """单个表格解析失败时只记录日志，不影响同批其它表格"""
+        try:
+            return self.parse(table_data)
+        except Exception as e:
+            print(f"⚠️ 表格解析失败: {e}")
+            return None
+
 
 # 获取环境变量
 base_url = os.getenv("OPENAI_BASE_URL", "http://localhost:8000/v1")
@@ -119,7 +145,8 @@ def get_table_parser() -> TableParserLLM:
         _table_parser = TableParserLLM(prompt_path=settings.llm_table_prompt,
                                        base_url=base_url,
                                        api_key=api_key,
-                                       model="Qwen3.5-4B")
+                                       model="Qwen3.5-4B",
+                                       greedy=True)
     return _table_parser
 
 
@@ -27,13 +27,18 @@ from .utils import safe_json_parse
 class TextAnalyzer(BaseLLM):
     """使用 LLM 分析体检报告文本内容"""
 
+    json_mode = True
+    # 多页报告常有重复页面文本，相同输入直接复用结果
+    response_cache_size = 256
+
     def __init__(
         self,
         prompt_path: str,
         base_url: str = "http://localhost:8000/v1",
         api_key: str = "EMPTY",
         model: str = "Qwen3.5-4B",
-        enable_thinking: bool = False
+        enable_thinking: bool = False,
+        greedy: bool = False
     ):
         """
         初始化文本分析器
@@ -49,7 +54,8 @@ class TextAnalyzer(BaseLLM):
             base_url=base_url,
             api_key=api_key,
             model=model,
-            enable_thinking=enable_thinking
+            enable_thinking=enable_thinking,
+            greedy=greedy
         )
 
     def analyze(
@@ -62,10 +68,10 @@ class TextAnalyzer(BaseLLM):
         Args:
             ocr_results: OCR 解析结果列表
         """
-        for ocr_result in ocr_results:
-            # 逐页分析
-            for page in ocr_result.pages:
-                page.text_analyses = self._analyze_page(page)
+        # 各页分析互相独立，并发提交给 vLLM 合并批处理
+        pages = [page for ocr_result in ocr_results for page in ocr_result.pages]
+        for page, analysis in zip(pages, self._map_concurrent(self._analyze_page, pages)):
+            page.text_analyses = analysis
 
         return ocr_results
 
@@ -167,7 +173,8 @@ def get_text_analyzer() -> TextAnalyzer:
         _text_analyzer = TextAnalyzer(prompt_path=settings.llm_text_prompt,
                                       base_url=base_url,
                                       api_key=api_key,
-                                      model="Qwen3.5-4B")
+                                      model="Qwen3.5-4B",
+                                      greedy=True)
     return _text_analyzer
 
 
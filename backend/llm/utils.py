@@ -44,6 +44,29 @@ class MedicalTermNormalizer:
 # 模块级单例：供 table_parser、rag 等共用同一张映射表
 medical_term_normalizer = MedicalTermNormalizer()
 
+# JSON 片段起始位置（数组或对象），模块加载时编译一次
+_JSON_START_RE = re.compile(r'[\[{]')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_last_json(text: str) -> Union[dict, list, None]:
+    """
+    从混杂文本中提取最后一个完整的 JSON 数组/对象
+
+    从每个 [ 或 { 处用 raw_decode 尝试解析一个值，成功则跳到该值末尾继续扫描，
+    整体单遍完成，嵌套结构也能完整解析
+    """
+    result = None
+    pos = 0
+    while True:
+        match = _JSON_START_RE.search(text, pos)
+        if not match:
+            return result
+        try:
+            result, pos = _JSON_DECODER.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            pos = match.start() + 1
+
 
 def safe_json_parse(text: str) -> Union[dict, list, None]:
         """
@@ -75,21 +98,10 @@ def safe_json_parse(text: str) -> Union[dict, list, None]:
         except json.JSONDecodeError:
             pass
 
-        # 尝试提取数组部分
-        array_matches = re.findall(r'\[[\s\S]*?\]', cleaned_text)
-        if array_matches:
-            try:
-                return json.loads(array_matches[-1])  # 使用最后一个匹配的数组
-            except json.JSONDecodeError:
-                pass
-
-        # 尝试提取对象部分
-        object_matches = re.findall(r'\{[\s\S]*?\}', cleaned_text)
-        if object_matches:
-            try:
-                return json.loads(object_matches[-1])
-            except json.JSONDecodeError:
-                pass
+        # 提取文本中最后一个完整的 JSON 数组/对象
+        result = _extract_last_json(cleaned_text)
+        if result is not None:
+            return result
 
         print(f"无法解析JSON: {text[:100]}...")
         return None
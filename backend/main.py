@@ -2,20 +2,25 @@
 CheckupAI Backend Service
 FastAPI + LangChain RAG Chain + Milvus Lite + vLLM
 
-启动采用懒初始化（_ensure_startup），避免 uvicorn fork/reload 导致模块被执行两次
+启动采用懒初始化（_ensure_startup），避免 uvicorn fork/reload 导致模块被执行两次；
+服务进程的 startup 事件中即触发初始化，首个请求无需等待模型加载
 """
 
+import asyncio
+import json
 import os
 import threading
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator
 
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from backend.config import settings
 from backend.llm import chat_llm
-from backend.rag import MedicalRAG
+from backend.rag import MedicalRAG, SemanticCache
 from backend.scenarios import ChatScenario, ReportScenario
 from backend.vector import get_milvus_client
 
@@ -27,13 +32,14 @@ _client: Any = None
 _rag: MedicalRAG | None = None
 _chat_scenario: ChatScenario | None = None
 _report_scenario: ReportScenario | None = None
+_answer_cache: SemanticCache | None = None
 _startup_lock = threading.Lock()
 _startup_done = False
 
 
 def _ensure_startup():
     """懒初始化所有组件，线程安全，只执行一次"""
-    global _client, _rag, _chat_scenario, _report_scenario, _startup_done
+    global _client, _rag, _chat_scenario, _report_scenario, _answer_cache, _startup_done
 
     if _startup_done:
         return
@@ -64,6 +70,9 @@ def _ensure_startup():
         _rag = MedicalRAG(_client)
         print("[CheckupAI] MedicalRAG 就绪")
 
+        # Step 3b: 预热 BGE-M3 与 Reranker，避免首个请求承担 CUDA 初始化开销
+        _warmup_models()
+
         # Step 4: LLM 初始化（已在 backend.llm.chat_llm 模块级完成）
         print(f"[CheckupAI] LLM 就绪 (model={chat_llm.model})")
 
@@ -73,12 +82,30 @@ def _ensure_startup():
         _report_scenario = ReportScenario(settings.llm_report_prompt, chat_llm)
         print("[CheckupAI] 场景就绪 (chat + report)")
 
+        # Step 6: 语义回答缓存
+        if settings.cache_enabled:
+            _answer_cache = SemanticCache(
+                threshold=settings.cache_semantic_threshold,
+                max_size=settings.cache_max_size,
+                ttl_seconds=settings.cache_ttl_seconds,
+            )
+            print(f"[CheckupAI] 语义缓存就绪 (threshold={settings.cache_semantic_threshold})")
+
         print("[CheckupAI] 启动完成")
         print("=" * 50)
 
         _startup_done = True
 
 
+def _warmup_models():
+    try:
+        _rag.embedder.encode_dense(["预热"])
+        _rag.reranker.rerank("预热", [{"text": "预热"}])
+        print("[CheckupAI] 模型预热完成")
+    except Exception as e:
+        print(f"[CheckupAI] 警告：模型预热失败 ({e})，跳过")
+
+
 def _auto_ingest_reports():
     try:
         count_result = _client.query(
@@ -198,6 +225,33 @@ def _get_client():
     return _client
 
 
+def _lookup_answer_cache(request: "ChatRequest", retrieval: Dict[str, Any]):
+    """
+    问答语义缓存查询，在查询改写与检索之后进行，只跳过 LLM 生成
+
+    以改写后的查询为 key（复用检索时已缓存的查询向量）；有对话历史时回答依赖上下文，
+    需要或用到用户报告数据时回答含个人指标值，均不走缓存
+
+    Returns:
+        (key, vector, cached)：不可缓存时 key 为 None；未命中时 cached 为 None
+    """
+    if _answer_cache is None or request.history.strip():
+        return None, None, None
+    if retrieval.get("need_report") or retrieval.get("report_items") or retrieval.get("report_page"):
+        return None, None, None
+    key = retrieval["rewritten_query"].strip()
+    if not key:
+        return None, None, None
+    vector = _rag.embed_query(key)
+    return key, vector, _answer_cache.get(key, vector)
+
+
+def _store_answer_cache(key: str | None, vector, answer: str):
+    if key is None or not answer:
+        return
+    _answer_cache.put(key, vector, answer)
+
+
 # ============================================================
 # FastAPI App
 # ============================================================
@@ -213,6 +267,12 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def _startup():
+    """服务启动时即完成初始化，模型加载不落在首个请求上"""
+    await asyncio.to_thread(_ensure_startup)
+
+
 # ============================================================
 # Pydantic Models
 # ============================================================
@@ -236,23 +296,31 @@ def read_root():
     return {"message": "CheckupAI API is running"}
 
 
+# 检索与 LLM 调用均为阻塞 IO，端点声明为同步函数交由 FastAPI 线程池执行，
+# 使并发请求能同时到达 vLLM 服务端，由其 continuous batching 合并解码
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+def chat(request: ChatRequest):
     """问答入口：三路检索 → LLM 生成回答"""
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="问题不能为空")
 
     retrieval = _get_rag().retrieve(request.question)
+    cache_key, cache_vec, cached = _lookup_answer_cache(request, retrieval)
+    if cached is not None:
+        return ChatResponse(answer=cached, retrieval=retrieval)
+
     try:
         answer = _get_chat_scenario().invoke(retrieval, request.question, history=request.history)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM 调用失败: {str(e)}")
 
+    _store_answer_cache(cache_key, cache_vec, answer)
     return ChatResponse(answer=answer, retrieval=retrieval)
 
 
 @app.post("/api/report", response_model=ChatResponse)
-async def generate_report(request: ChatRequest):
+def generate_report(request: ChatRequest):
     """报告生成入口：三路检索（跳过问答，权威 rerank top 1）→ LLM 生成结构化报告"""
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="问题不能为空")
@@ -266,6 +334,74 @@ async def generate_report(request: ChatRequest):
     return ChatResponse(answer=report, retrieval=retrieval)
 
 
+# ---------- SSE 流式输出 ----------
+
+def _sse_event(data: Dict[str, Any], event: str | None = None) -> str:
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+
+def _stream_answer(
+    scenario,
+    retrieval: Dict[str, Any],
+    request: ChatRequest,
+    on_complete: Callable[[str], None] | None = None,
+) -> Iterator[str]:
+    """先推送检索结果（retrieval 事件），再逐段推送回答增量，结束时发送 done 事件"""
+    yield _sse_event(retrieval, event="retrieval")
+    deltas = []
+    try:
+        for delta in scenario.stream(retrieval, request.question, history=request.history):
+            deltas.append(delta)
+            yield _sse_event({"delta": delta})
+    except Exception as e:
+        yield _sse_event({"detail": f"LLM 调用失败: {str(e)}"}, event="error")
+        return
+    if on_complete is not None:
+        on_complete("".join(deltas))
+    yield _sse_event({}, event="done")
+
+
+def _stream_cached(answer: str, retrieval: Dict[str, Any]) -> Iterator[str]:
+    yield _sse_event(retrieval, event="retrieval")
+    yield _sse_event({"delta": answer})
+    yield _sse_event({}, event="done")
+
+
+@app.post("/api/chat/stream")
+def chat_stream(request: ChatRequest):
+    """问答入口（SSE 流式）"""
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="问题不能为空")
+
+    retrieval = _get_rag().retrieve(request.question)
+    cache_key, cache_vec, cached = _lookup_answer_cache(request, retrieval)
+    if cached is not None:
+        return StreamingResponse(_stream_cached(cached, retrieval), media_type="text/event-stream")
+
+    return StreamingResponse(
+        _stream_answer(
+            _get_chat_scenario(), retrieval, request,
+            on_complete=lambda answer: _store_answer_cache(cache_key, cache_vec, answer),
+        ),
+        media_type="text/event-stream",
+    )
+
+
+@app.post("/api/report/stream")
+def generate_report_stream(request: ChatRequest):
+    """报告生成入口（SSE 流式）"""
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="问题不能为空")
+
+    retrieval = _get_rag().retrieve(request.question, skip_qa=True, knowledge_rerank_k=1)
+    return StreamingResponse(
+        _stream_answer(_get_report_scenario(), retrieval, request),
+        media_type="text/event-stream",
+    )
+
+
 @app.get("/api/health")
 def health_check():
     """健康检查：返回 DB 状态和各 Collection 行数"""
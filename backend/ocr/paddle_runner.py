@@ -1,75 +1,226 @@
 """
 PaddleOCR Runner Script
 被 subprocess 调用的 OCR 执行脚本
+
+两种运行方式：
+- 单次模式：--image/--output 处理一个或多个输入后退出
+- 常驻模式：--serve 只加载一次模型，从 stdin 逐行读取 JSON 任务
+  {"image": 路径或路径列表, "output": ...}，每个任务完成后向 stdout 输出一行
+  "@@OCR_DONE@@ {json}"；读到 EOF 或 {"cmd": "exit"} 时退出
 """
 
 import os
+import sys
+import json
+import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+
+# Paddle 显存分配策略须在导入 paddle 前设置：按需增长而非启动时预占大部分显存，
+# 使多个 OCR 进程可共享一张卡；中间张量用完即释放。已在环境变量中指定的不覆盖
+os.environ.setdefault("FLAGS_allocator_strategy", "auto_growth")
+os.environ.setdefault("FLAGS_eager_delete_tensor_gb", "0.0")
+
 from paddleocr import PaddleOCRVL
 
+# 常驻模式下任务完成标记，PaddleOCR 自身的日志也会写 stdout，调用方据此区分
+DONE_MARKER = "@@OCR_DONE@@"
+
+
+def build_pipeline(
+    device: str = "cpu",
+    precision: str = None,
+    enable_mkldnn: bool = None,
+    cpu_threads: int = None,
+) -> PaddleOCRVL:
+    """
+    构建 OCR 流水线（加载模型）
+
+    Args:
+        device: 运行设备，如 "cpu"、"gpu:0"
+        precision: 推理精度，默认 GPU 用 fp16、CPU 用 fp32
+        enable_mkldnn: 是否启用 MKL-DNN 加速，默认仅 CPU 开启
+        cpu_threads: CPU 推理线程数，默认为核数的一半
 
-def process(file_path: str, device: str = "cpu"):
+    Returns:
+        PaddleOCRVL 实例
+    """
+    on_gpu = device.startswith("gpu")
+    if precision is None:
+        precision = "fp16" if on_gpu else "fp32"
+    if enable_mkldnn is None:
+        enable_mkldnn = not on_gpu
+    if cpu_threads is None:
+        cpu_threads = max(1, (os.cpu_count() or 2) // 2)
+
+    # 其它进程暂时占满显存时等待后重试
+    for attempt in range(3):
+        try:
+            return PaddleOCRVL(
+                device=device,
+                precision=precision,
+                enable_mkldnn=enable_mkldnn,
+                cpu_threads=cpu_threads,
+            )
+        except (RuntimeError, MemoryError) as e:
+            if attempt == 2 or "out of memory" not in str(e).lower():
+                raise
+            print(f"显存不足，30 秒后重试加载模型: {e}", file=sys.stderr)
+            time.sleep(30)
+
+
+def process(file_path, device: str = "cpu", ocr_pipeline: PaddleOCRVL = None):
     """
     执行 OCR 处理
-    
+
     Args:
-        file_path: 输入图片路径
-        use_gpu: 是否使用 GPU
-        gpu_id: GPU 设备 ID
-        
+        file_path: 输入图片路径，或路径列表（一次提交给 predict_iter 批量处理）
+        device: 运行设备，未传入 ocr_pipeline 时用于构建流水线
+        ocr_pipeline: 已加载的流水线，常驻模式下复用
+
     Returns:
         OCR 输出结果
     """
-    
-    ocr_pipeline = PaddleOCRVL(
-        device=device,
-    )
-    
+    if ocr_pipeline is None:
+        ocr_pipeline = build_pipeline(device)
+
     # 执行 OCR
     output = ocr_pipeline.predict_iter(file_path)
-    
+
     return output
 
 
+def save_results(output, output_dir: str):
+    """
+    保存 OCR 结果：<output_dir>/<输入文件名>/<页面索引>/ 下存放 JSON 与图片
+
+    Args:
+        output: process 返回的结果迭代器
+        output_dir: 输出目录
+    """
+    # 已创建的目录，同一目录只调用一次 makedirs
+    created_dirs = set()
+
+    def makedirs(path: str):
+        if path not in created_dirs:
+            os.makedirs(path, exist_ok=True)
+            created_dirs.add(path)
+
+    # 创建输出目录
+    makedirs(output_dir)
+
+    # JSON 序列化与图片编码写盘都交给线程池（PIL 编码时会释放 GIL），
+    # 主线程拿到一页结果后立即回到 predict_iter 推理下一页，写盘与推理重叠
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = []
+        for res in output:
+            # 以输入文件名命名的子目录，页面索引作为更深层的目录
+            base_name = os.path.basename(res['input_path'])
+            page_index = res.get('page_index', 0) or 0
+            output_subsubdir = os.path.join(output_dir, base_name, str(page_index))
+            makedirs(output_subsubdir)
+
+            # 保存 JSON 结果到子目录
+            futures.append(pool.submit(res.save_to_json, save_path=output_subsubdir))
+
+            # 保存图片到子目录
+            for img_info in res['imgs_in_doc']:
+                save_path = os.path.join(output_subsubdir, img_info['path'])
+                makedirs(os.path.dirname(save_path))
+                futures.append(pool.submit(img_info['img'].save, save_path))
+
+        # 等待全部图片写完，并抛出保存过程中的异常
+        for future in futures:
+            future.result()
+
+
+def _reply(payload: dict):
+    """常驻模式：输出一行任务结果"""
+    sys.stdout.write(f"{DONE_MARKER} {json.dumps(payload, ensure_ascii=False)}\n")
+    sys.stdout.flush()
+
+
+def _release_gpu_cache():
+    """常驻模式下每个任务结束后归还空闲显存，供同卡的其它进程使用"""
+    try:
+        import paddle
+        paddle.device.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+def serve(device: str = "cpu", **pipeline_kwargs):
+    """
+    常驻模式：模型只加载一次，循环处理 stdin 中的任务
+
+    Args:
+        device: 运行设备
+        pipeline_kwargs: 透传给 build_pipeline 的推理参数
+    """
+    ocr_pipeline = build_pipeline(device, **pipeline_kwargs)
+    _reply({"ready": True})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            _reply({"ok": False, "error": f"任务格式错误: {e}"})
+            continue
+
+        if job.get("cmd") == "exit":
+            break
+
+        try:
+            output = process(job["image"], ocr_pipeline=ocr_pipeline)
+            save_results(output, job["output"])
+            _reply({"ok": True, "output": job["output"]})
+        except Exception as e:
+            _reply({"ok": False, "output": job.get("output"), "error": str(e)})
+        finally:
+            if device.startswith("gpu"):
+                _release_gpu_cache()
+
+
 def main():
     parser = argparse.ArgumentParser(description="PaddleOCR Runner")
-    parser.add_argument("--image", type=str, required=True, help="输入图片路径")
-    parser.add_argument("--output", type=str, required=True, help="输出 JSON 目录")
+    parser.add_argument("--image", type=str, nargs="+", help="输入图片路径，可传多个")
+    parser.add_argument("--output", type=str, help="输出 JSON 目录")
     parser.add_argument("--gpu", action="store_true", help="是否使用 GPU")
     parser.add_argument("--gpu-id", type=int, default=0, help="GPU 设备 ID")
-    
+    parser.add_argument("--serve", action="store_true", help="常驻模式，从 stdin 读取任务")
+    parser.add_argument("--precision", choices=["fp32", "fp16"], help="推理精度，默认 GPU fp16 / CPU fp32")
+    parser.add_argument("--mkldnn", action=argparse.BooleanOptionalAction, default=None,
+                        help="是否启用 MKL-DNN，默认仅 CPU 开启")
+    parser.add_argument("--cpu-threads", type=int, help="CPU 推理线程数，默认为核数的一半")
+
     args = parser.parse_args()
-    
-    # 创建输出目录
-    os.makedirs(args.output, exist_ok=True)
-    
-    # 执行 OCR
+
     device = f"gpu:{args.gpu_id}" if args.gpu else "cpu"
-    output = process(args.image, device=device)
-    
+    pipeline_kwargs = {
+        "precision": args.precision,
+        "enable_mkldnn": args.mkldnn,
+        "cpu_threads": args.cpu_threads,
+    }
+
+    if args.serve:
+        serve(device=device, **pipeline_kwargs)
+        return
+
+    if not args.image or not args.output:
+        parser.error("单次模式需要 --image 和 --output")
+
+    # 执行 OCR：多个输入一次性提交
+    images = args.image[0] if len(args.image) == 1 else args.image
+    output = process(images, ocr_pipeline=build_pipeline(device, **pipeline_kwargs))
+
     # 保存结果
-    for res in output:
-        # 创建以输入文件名命名的子目录
-        base_name = os.path.basename(res['input_path'])
-        output_subdir = os.path.join(args.output, base_name)
-        os.makedirs(output_subdir, exist_ok=True)
-
-        # 添加页面索引作为更深层的目录
-        page_index = res.get('page_index', 0) or 0
-        output_subsubdir = os.path.join(output_subdir, str(page_index))
-        os.makedirs(output_subsubdir, exist_ok=True)
-        
-        # 保存 JSON 结果到子目录
-        res.save_to_json(save_path=output_subsubdir)
-        
-        # 保存图片到子目录
-        for idx, img_info in enumerate(res['imgs_in_doc']):
-            img = img_info['img']
-            save_path = os.path.join(output_subsubdir, img_info['path'])
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            img.save(save_path)
-    
+    save_results(output, args.output)
+
     print(f"保存成功，路径：{args.output}")
 
 
@@ -19,7 +19,45 @@ from backend.ocr import (
     TableItem,
     TextRegion,
 )
-from backend.ocr import table_html_clean, table_html_to_md
+from backend.ocr import table_html_to_md
+
+# 作为文本区域处理的块类型
+_TEXT_LABELS = frozenset({
+    "text",
+    "content",
+    "doc_title",
+    "figure_title",
+    "paragraph_title",
+})
+
+# 表格上下文中需排除的个人信息模式，合并为一个正则，每行文本只扫描一遍
+_CONTEXT_EXCLUDE_PATTERNS = (
+    r'姓名 [：:\s]',
+    r'性别 [：:\s]',
+    r'年龄 [：:\s]',
+    r'门诊号 [：:\s]',
+    r'住院号 [：:\s]',
+    r'体检号 [：:\s]',
+    r'No[.:]\s*\w+',
+    r'编号 [：:\s]',
+    r'\bID[：:\s]',
+    r'报告日期',
+    r'体检日期',
+    r'打印日期',
+    r'就诊卡',
+)
+_CONTEXT_EXCLUDE_RE = re.compile('|'.join(_CONTEXT_EXCLUDE_PATTERNS), re.IGNORECASE)
+
+# 可能作为表格标题的医疗检查关键词，同样合并为一个正则一次扫描
+_CONTEXT_KEYWORDS = (
+    '血常规', '尿常规', '便常规',
+    '肝功能', '肾功能', '血脂', '血糖',
+    '心电图', '胸片', 'CT', 'B 超', '彩超',
+    '肿瘤标志物', '凝血', '生化', '肝炎', '乙肝',
+    '甲功', '糖化', '离子', '心肌酶',
+    '免疫', '激素', '贫血', '检验', '检查',
+)
+_CONTEXT_KEYWORD_RE = re.compile('|'.join(map(re.escape, _CONTEXT_KEYWORDS)))
 
 
 class UniversalParser:
@@ -52,9 +90,15 @@ class UniversalParser:
             OCRResult 对象
         """
         pages = []
+        pending_tables = []
         for raw_page in raw_output.pages:
-            page = self._parse_single_page(raw_page)
+            page, page_tables = self._parse_single_page(raw_page)
             pages.append(page)
+            pending_tables.append(page_tables)
+
+        # 整份文件的表格一次性并发提交 LLM 分类与解析，由 vLLM 合并批处理
+        for page, tables in zip(pages, self._build_tables(pending_tables)):
+            page.tables = tables
 
         file_format = self._extract_file_format(raw_output.input_path)
 
@@ -67,7 +111,7 @@ class UniversalParser:
             pages=pages,
         )
 
-    def _parse_single_page(self, raw_page: RawPageOutput) -> Page:
+    def _parse_single_page(self, raw_page: RawPageOutput) -> tuple[Page, list]:
         """
         解析单个页面
 
@@ -75,27 +119,22 @@ class UniversalParser:
             raw_page: 单页的原始输出
 
         Returns:
-            Page 对象
+            (Page 对象, 待解析表格列表)；表格的 LLM 分类与解析由 _build_tables 统一批量完成
         """
         text_regions = []
-        tables = []
+        pending_tables = []  # [(block_id, table_md), ...]
         images = []
         context_before_table = []
         first_table_found = False
         context_text = None
 
         for block in raw_page.blocks:
-            if block.label in [
-                "text",
-                "content",
-                "doc_title",
-                "figure_title",
-                "paragraph_title",
-            ]:
+            label = block.label
+            if label in _TEXT_LABELS:
                 text_regions.append(
                     TextRegion(
                         index=block.block_id,
-                        label=block.label,
+                        label=label,
                         text=block.content,
                         bbox=block.bbox,
                         confidence=block.confidence,
@@ -104,7 +143,7 @@ class UniversalParser:
                 )
                 if not first_table_found:
                     context_before_table.append(block)
-            elif block.label == "table":
+            elif label == "table":
                 first_table_found = True
                 table_html = block.content
                 
@@ -122,12 +161,12 @@ class UniversalParser:
                             )
                         )
 
-                table_html = table_html_clean(table_html)
+                # 转义序列在 table_html_to_md 提取单元格文本时一并替换
                 tables_md = table_html_to_md(table_html)
 
                 if tables_md:
                     # 只给第一个表格添加上下文（每个页面独立处理）
-                    if len(tables) == 0 and context_text is None:
+                    if not pending_tables and context_text is None:
                         # 过滤 context 内容
                         context_text = self._filter_context_text(
                             context_before_table)
@@ -135,28 +174,8 @@ class UniversalParser:
                             tables_md["tables"][0]["context"] = context_text
 
                     for table_md in tables_md["tables"]:
-                        table_types = table_parse_router.router(table_md)
-                        if TableType.measured in table_types:
-                            llm_result = table_parser.parse(table_md)
-                            # 转换为 Table 对象
-                            if llm_result:
-                                table_obj = Table(
-                                    index=block.block_id,
-                                    title=llm_result.get('title', '') if isinstance(
-                                        llm_result, dict) else '',
-                                    items=self._build_table_items(
-                                        llm_result) if isinstance(llm_result, dict) else [],
-                                    raw_md=table_md["markdown"],
-                                    types=table_types
-                                )
-                        else:
-                            table_obj = Table(
-                                index=block.block_id,
-                                raw_md=table_md["markdown"],
-                                types=table_types
-                            )
-                        tables.append(table_obj)
-            elif block.label == "image":
+                        pending_tables.append((block.block_id, table_md))
+            elif label == "image":
                 img_path = self._match_image_path(
                     raw_page.image_paths, block.bbox)
                 if img_path:
@@ -168,14 +187,61 @@ class UniversalParser:
                         )
                     )
 
-        return Page(
+        page = Page(
             page_index=raw_page.page_index,
             image_width=raw_page.width,
             image_height=raw_page.height,
             regions=text_regions,
-            tables=tables,
             images=images,
         )
+        return page, pending_tables
+
+    @classmethod
+    def _build_tables(cls, pending_tables: List[list]) -> List[List[Table]]:
+        """
+        批量分类表格、解析数值检验类表格并构建 Table 对象
+
+        Args:
+            pending_tables: 按页分组的待解析表格 [[(block_id, table_md), ...], ...]
+
+        Returns:
+            按页分组的 Table 列表
+        """
+        all_tables = [table_md for page_tables in pending_tables for _, table_md in page_tables]
+        all_types = table_parse_router.router_batch(all_tables)
+
+        measured = [
+            table_md
+            for table_md, table_types in zip(all_tables, all_types)
+            if TableType.measured in table_types
+        ]
+        llm_results = iter(table_parser.parse_batch(measured))
+        types_iter = iter(all_types)
+
+        pages_tables = []
+        for page_tables in pending_tables:
+            tables = []
+            for block_id, table_md in page_tables:
+                table_types = next(types_iter)
+                llm_result = next(llm_results) if TableType.measured in table_types else None
+                if isinstance(llm_result, dict):
+                    tables.append(Table(
+                        index=block_id,
+                        title=llm_result.get('title', ''),
+                        items=cls._build_table_items(llm_result),
+                        raw_md=table_md["markdown"],
+                        types=table_types
+                    ))
+                else:
+                    # 非数值检验表格，或 LLM 未返回有效结果：仅保留原始 Markdown
+                    tables.append(Table(
+                        index=block_id,
+                        raw_md=table_md["markdown"],
+                        types=table_types
+                    ))
+            pages_tables.append(tables)
+
+        return pages_tables
 
     @staticmethod
     def _build_table_items(table_data: dict) -> List[TableItem]:
@@ -220,33 +286,6 @@ class UniversalParser:
         Returns:
             过滤后的文本字符串
         """
-        # 排除模式（正则）
-        exclude_patterns = [
-            r'姓名 [：:\s]',
-            r'性别 [：:\s]',
-            r'年龄 [：:\s]',
-            r'门诊号 [：:\s]',
-            r'住院号 [：:\s]',
-            r'体检号 [：:\s]',
-            r'No[.:]\s*\w+',
-            r'编号 [：:\s]',
-            r'\bID[：:\s]',
-            r'报告日期',
-            r'体检日期',
-            r'打印日期',
-            r'就诊卡',
-        ]
-
-        # 医疗检查关键词
-        keywords = [
-            '血常规', '尿常规', '便常规',
-            '肝功能', '肾功能', '血脂', '血糖',
-            '心电图', '胸片', 'CT', 'B 超', '彩超',
-            '肿瘤标志物', '凝血', '生化', '肝炎', '乙肝',
-            '甲功', '糖化', '离子', '心肌酶',
-            '免疫', '激素', '贫血', '检验', '检查',
-        ]
-
         filtered_lines = []
         for block in blocks:
             content = getattr(block, 'content', '').strip()
@@ -258,11 +297,11 @@ class UniversalParser:
                 continue
 
             # 检查是否包含排除模式
-            if any(re.search(p, content, re.IGNORECASE) for p in exclude_patterns):
+            if _CONTEXT_EXCLUDE_RE.search(content):
                 continue
 
             # 保留：包含关键词 或 短文本（<20 字符）
-            if any(kw in content for kw in keywords) or len(content) < 20:
+            if len(content) < 20 or _CONTEXT_KEYWORD_RE.search(content):
                 filtered_lines.append(content)
 
         return "\n".join(filtered_lines)
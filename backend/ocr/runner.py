@@ -3,24 +3,174 @@ OCR Runner Module
 封装 PaddleOCR 的 subprocess 调用
 """
 
+import asyncio
+import atexit
 import json
 import os
+import queue
 import re
 import subprocess
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Union
 
 from backend.config import settings
 from backend.ocr import RawBlock, RawFileOutput, RawPageOutput
 
 
+# 与 paddle_runner.DONE_MARKER 保持一致（两者运行在不同 Python 环境，不能互相导入）
+_DONE_MARKER = "@@OCR_DONE@@"
+
+
+# 可重试的资源类错误（显存/内存不足），其余错误重试也无济于事
+_TRANSIENT_ERROR_RE = re.compile(r"out of memory|ResourceExhausted|CUDA error", re.IGNORECASE)
+
+
+def _is_transient_error(error: str) -> bool:
+    return bool(_TRANSIENT_ERROR_RE.search(error))
+
+
+class _OCRDaemon:
+    """常驻的 paddle_runner --serve 子进程，模型只加载一次，任务经 stdin/stdout 逐行收发"""
+
+    def __init__(self, cmd: List[str]):
+        self._proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        # 同一子进程一次只处理一个任务
+        self._lock = threading.Lock()
+        # 等待模型加载完成
+        self._read_reply()
+
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def _read_reply(self) -> Dict[str, Any]:
+        """读取下一条任务结果，跳过 PaddleOCR 自身输出到 stdout 的日志"""
+        for line in self._proc.stdout:
+            if line.startswith(_DONE_MARKER):
+                return json.loads(line[len(_DONE_MARKER):])
+        raise RuntimeError(f"OCR 常驻进程已退出 (returncode={self._proc.poll()})")
+
+    def submit(self, file_path: Union[str, List[str]], output_dir: str) -> Dict[str, Any]:
+        """
+        提交一个 OCR 任务并等待完成；file_path 为列表时整批交给 predict_iter
+
+        Returns:
+            任务结果 {"ok": bool, "output": str, "error": str(可选)}
+        """
+        job = json.dumps({"image": file_path, "output": output_dir}, ensure_ascii=False)
+        with self._lock:
+            self._proc.stdin.write(job + "\n")
+            self._proc.stdin.flush()
+            return self._read_reply()
+
+    def close(self, timeout: float = 10):
+        """发送退出指令并等待子进程结束"""
+        with self._lock:
+            if self.alive():
+                try:
+                    self._proc.stdin.write(json.dumps({"cmd": "exit"}) + "\n")
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=timeout)
+                except (OSError, subprocess.TimeoutExpired):
+                    self._proc.kill()
+
+
+class _OCRDaemonPool:
+    """
+    常驻 OCR 进程池：最多启动 size 个进程，任务从空闲队列中取一个进程执行，
+    完成后归还；全部忙碌时排队等待。进程按需启动，异常退出的进程在下次取用时重启
+    """
+
+    def __init__(self, cmd: List[str], size: int = 1):
+        self._cmd = cmd
+        self._size = max(1, size)
+        self._idle: "queue.Queue[_OCRDaemon]" = queue.Queue()
+        self._daemons: List[_OCRDaemon] = []
+        # 已启动（含正在加载模型）的进程数
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _start(self) -> _OCRDaemon:
+        """启动一个进程；调用方已为其预占一个名额（_started），启动失败时释放该名额"""
+        print(f"[PaddleOCRRunner] 启动常驻 OCR 进程 ({self._started}/{self._size})")
+        try:
+            daemon = _OCRDaemon(self._cmd)
+        except Exception:
+            with self._lock:
+                self._started -= 1
+            raise
+        with self._lock:
+            self._daemons.append(daemon)
+        return daemon
+
+    def _acquire(self) -> _OCRDaemon:
+        while True:
+            try:
+                daemon = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_start = self._started < self._size
+                    if can_start:
+                        self._started += 1
+                # 模型加载较慢，在锁外启动；池已满时等待其它任务归还进程
+                daemon = self._start() if can_start else self._idle.get()
+
+            if daemon.alive():
+                return daemon
+            # 已退出的进程释放名额后重新取用，替换进程按正常流程预占名额再启动
+            with self._lock:
+                if daemon in self._daemons:
+                    self._daemons.remove(daemon)
+                    self._started -= 1
+
+    def submit(self, file_path: Union[str, List[str]], output_dir: str) -> Dict[str, Any]:
+        """从池中取一个空闲进程执行任务，完成后归还"""
+        daemon = self._acquire()
+        try:
+            return daemon.submit(file_path, output_dir)
+        finally:
+            self._idle.put(daemon)
+
+    def close(self):
+        """关闭池中所有进程"""
+        with self._lock:
+            daemons = list(self._daemons)
+            self._daemons.clear()
+            self._started = 0
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for daemon in daemons:
+            daemon.close()
+
+
 class PaddleOCRRunner:
     """PaddleOCR 运行器，通过 subprocess 调用独立的 OCR 脚本"""
 
+    # 常驻进程池按 (use_gpu, gpu_id) 在所有实例间共享
+    _daemons: Dict[tuple, _OCRDaemonPool] = {}
+    _daemons_lock = threading.Lock()
+    # 本进程内已创建的输出目录
+    _created_dirs: Set[str] = set()
+    # run_async 的并发上限，按事件循环各一个
+    _semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+        weakref.WeakKeyDictionary()
+    )
+
     def __init__(
         self,
         use_gpu: Optional[bool] = None,
         gpu_id: Optional[int] = None,
+        persistent: Optional[bool] = None,
     ):
         """
         初始化 PaddleOCR 运行器
@@ -28,13 +178,47 @@ class PaddleOCRRunner:
         Args:
             use_gpu: 是否使用 GPU，默认从 settings 读取
             gpu_id: GPU 设备 ID，默认从 settings 读取
+            persistent: 是否使用常驻 OCR 进程（模型只加载一次），默认从 settings 读取
         """
         self.use_gpu = use_gpu if use_gpu is not None else settings.ocr_use_gpu
         self.gpu_id = gpu_id if gpu_id is not None else settings.ocr_gpu_id
+        self.persistent = persistent if persistent is not None else settings.ocr_persistent
         self._script_path = os.path.join(
             os.path.dirname(__file__), "paddle_runner.py"
         )
 
+    def _device_args(self) -> List[str]:
+        return ["--gpu", "--gpu-id", str(self.gpu_id)] if self.use_gpu else []
+
+    def _get_pool(self) -> _OCRDaemonPool:
+        """获取当前设备对应的常驻 OCR 进程池（进程在首个任务到来时启动）"""
+        key = (self.use_gpu, self.gpu_id)
+        with self._daemons_lock:
+            pool = self._daemons.get(key)
+            if pool is None:
+                pool = _OCRDaemonPool(
+                    [settings.ocr_python, self._script_path, "--serve", *self._device_args()],
+                    size=settings.ocr_workers,
+                )
+                self._daemons[key] = pool
+            return pool
+
+    def close(self):
+        """关闭当前设备对应的常驻 OCR 进程池"""
+        with self._daemons_lock:
+            pool = self._daemons.pop((self.use_gpu, self.gpu_id), None)
+        if pool is not None:
+            pool.close()
+
+    @classmethod
+    def close_all(cls):
+        """关闭所有常驻 OCR 进程（进程退出时自动调用）"""
+        with cls._daemons_lock:
+            pools = list(cls._daemons.values())
+            cls._daemons.clear()
+        for pool in pools:
+            pool.close()
+
     def run(self, file_path: str, output_dir: Optional[str] = None) -> str:
         """
         执行 OCR 处理
@@ -46,37 +230,152 @@ class PaddleOCRRunner:
         Returns:
             输出 JSON 目录路径
         """
-        # 确定输出目录
+        return self._run_job([str(file_path)], output_dir)
+
+    def run_batch(self, file_paths: List[str], output_dir: Optional[str] = None) -> str:
+        """
+        批量执行 OCR：所有输入一次性交给 predict_iter，结果写入同一输出目录
+
+        Args:
+            file_paths: 输入图片/pdf路径列表
+            output_dir: 输出 JSON 目录，默认生成带时间戳的目录
+
+        Returns:
+            输出 JSON 目录路径
+        """
+        return self._run_job([str(p) for p in file_paths], output_dir)
+
+    @classmethod
+    def _resolve_output_dir(cls, output_dir: Optional[str]) -> str:
+        """
+        确定输出目录：默认在 ocr_output 下生成带时间戳的唯一目录
+
+        mkdtemp 一次 mkdir 即可建出目录，同一秒内的并发任务也不会写进同一目录；
+        已创建过的目录不再重复 makedirs
+        """
         if output_dir is None:
+            parent = str(settings.project_root / "data/sensitive/ocr_output")
+            cls._ensure_dir(parent)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_dir = str(settings.project_root / f"data/sensitive/ocr_output/{timestamp}/")
+            try:
+                output_dir = tempfile.mkdtemp(prefix=f"{timestamp}_", dir=parent)
+            except FileNotFoundError:
+                # 父目录在运行期间被清理，重新创建
+                os.makedirs(parent, exist_ok=True)
+                output_dir = tempfile.mkdtemp(prefix=f"{timestamp}_", dir=parent)
+            cls._created_dirs.add(output_dir)
+        else:
+            cls._ensure_dir(output_dir)
+        return output_dir
 
-        os.makedirs(output_dir, exist_ok=True)
+    @classmethod
+    def _ensure_dir(cls, path: str):
+        if path not in cls._created_dirs:
+            os.makedirs(path, exist_ok=True)
+            cls._created_dirs.add(path)
 
-        # 构建命令
-        cmd = [
+    def _build_command(self, file_paths: List[str], output_dir: str) -> List[str]:
+        return [
             settings.ocr_python,
             self._script_path,
-            "--image", str(file_path),
+            "--image", *file_paths,
             "--output", str(output_dir),
+            *self._device_args(),
         ]
 
-        if self.use_gpu:
-            cmd.extend(["--gpu", "--gpu-id", str(self.gpu_id)])
+    def _submit_to_daemon(self, file_paths: List[str], output_dir: str) -> Dict[str, Any]:
+        images = file_paths[0] if len(file_paths) == 1 else file_paths
+        try:
+            reply = self._get_pool().submit(images, str(output_dir))
+        except Exception as e:
+            # 与子进程模式保持一致：进程崩溃/启动失败不抛异常，由 load_result 阶段发现缺失结果；
+            # 退出的进程在下次取用时重启
+            reply = {"ok": False, "output": str(output_dir), "error": str(e)}
+        if not reply.get("ok"):
+            print(f"[PaddleOCRRunner] OCR 执行失败：{reply.get('error')}")
+        return reply
+
+    @staticmethod
+    def _check_returncode(returncode: int, stderr: str):
+        # 保持原有行为：失败不抛异常，由 load_result 阶段发现缺失结果
+        if returncode != 0:
+            tail = stderr.strip()[-500:] if stderr else ""
+            print(f"[PaddleOCRRunner] OCR 进程退出码 {returncode}：{tail}")
+
+    def _run_job(self, file_paths: List[str], output_dir: Optional[str]) -> str:
+        output_dir = self._resolve_output_dir(output_dir)
 
-        # 执行 subprocess
+        if self.persistent:
+            self._submit_to_daemon(file_paths, output_dir)
+            return output_dir
+
+        # stdout 只有进度日志，直接丢弃，避免整段缓存在内存中
         result = subprocess.run(
-            cmd,
-            capture_output=True,
+            self._build_command(file_paths, output_dir),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True
         )
+        self._check_returncode(result.returncode, result.stderr)
+
+        return output_dir
+
+    async def run_async(self, file_path: str, output_dir: Optional[str] = None) -> str:
+        """
+        异步执行 OCR 处理，等待期间不阻塞事件循环，可在同一事件循环中并发多个任务
+
+        Args:
+            file_path: 输入图片/pdf路径，或者包含多个图片/pdf的文件夹路径
+            output_dir: 输出 JSON 目录，默认生成带时间戳的目录
 
-        # 检查执行结果
-        # if result.returncode != 0:
-        #     raise RuntimeError(f"OCR 执行失败：{result.stderr.strip()}")
+        Returns:
+            输出 JSON 目录路径
+        """
+        file_paths = [str(file_path)]
+        output_dir = self._resolve_output_dir(output_dir)
+
+        # 限制同时在跑的 OCR 任务数，避免并发请求把显存占满
+        async with self._get_semaphore():
+            # max_retries 为总尝试次数，配置为 0 时也至少执行一次
+            max_attempts = max(1, settings.ocr_max_retries)
+            for attempt in range(max_attempts):
+                error = await self._run_once_async(file_paths, output_dir)
+                if not error or not _is_transient_error(error):
+                    break
+                if attempt + 1 < max_attempts:
+                    delay = 2 ** attempt
+                    print(f"[PaddleOCRRunner] OCR 资源不足，{delay}s 后重试 ({attempt + 1}/{max_attempts})")
+                    await asyncio.sleep(delay)
 
         return output_dir
 
+    async def _run_once_async(self, file_paths: List[str], output_dir: str) -> str:
+        """执行一次 OCR，返回错误信息（成功时为空字符串）"""
+        if self.persistent:
+            # 常驻进程的收发是阻塞 IO，放到线程中等待
+            reply = await asyncio.to_thread(self._submit_to_daemon, file_paths, output_dir)
+            return "" if reply.get("ok") else str(reply.get("error", ""))
+
+        proc = await asyncio.create_subprocess_exec(
+            *self._build_command(file_paths, output_dir),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await proc.communicate()
+        stderr_text = stderr.decode("utf-8", errors="replace")
+        self._check_returncode(proc.returncode, stderr_text)
+        return stderr_text if proc.returncode != 0 else ""
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        """按事件循环获取并发信号量（信号量不能跨事件循环使用）"""
+        loop = asyncio.get_running_loop()
+        semaphore = cls._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.ocr_max_concurrency)
+            cls._semaphores[loop] = semaphore
+        return semaphore
+
     def load_result(self, output_dir: str) -> List[RawFileOutput]:
         """
         加载 OCR 输出结果为统一的中间层结构
@@ -87,7 +386,8 @@ class PaddleOCRRunner:
         Returns:
             RawFileOutput 列表（每个文件一个结果）
         """
-        raw_outputs = []
+        # 第一遍只遍历目录结构，收集每页的图片与候选 JSON 路径
+        file_entries = []  # [(file_path, [(page_path, page_images, json_files), ...]), ...]
 
         # 遍历所有以文件名命名的子目录
         for file_dir in os.listdir(output_dir):
@@ -95,7 +395,7 @@ class PaddleOCRRunner:
             if os.path.isfile(file_path):
                 continue
 
-            raw_pages = []
+            page_entries = []
 
             # 遍历所有页面索引目录
             for page_dir in os.listdir(file_path):
@@ -104,7 +404,6 @@ class PaddleOCRRunner:
                     continue
 
                 page_images = []
-                page_json = None
 
                 # 收集该页面目录下的所有图片路径
                 if os.path.isdir("imgs"):
@@ -119,24 +418,29 @@ class PaddleOCRRunner:
                                 continue
                             page_images.append(os.path.join(page_path, img_file))
 
-                # 加载 JSON 文件
-                for filename in os.listdir(page_path):
-                    if not filename.endswith('.json'):
-                        continue
-
-                    json_file = os.path.join(page_path, filename)
+                json_files = [
+                    os.path.join(page_path, filename)
+                    for filename in os.listdir(page_path)
+                    if filename.endswith('.json')
+                ]
+                page_entries.append((page_path, page_images, json_files))
 
-                    if os.path.isdir(json_file):
-                        continue
+            file_entries.append((file_path, page_entries))
 
-                    try:
-                        with open(json_file, 'r', encoding='utf-8') as f:
-                            page_json = json.load(f)
-                            break
-                    except (json.JSONDecodeError, IOError) as e:
-                        print(f"⚠️ 加载 JSON 文件失败 {json_file}: {str(e)}")
-                        continue
+        # 第二遍并发读取并解析所有页面 JSON，重叠磁盘 IO 与解析
+        all_json_files = [
+            json_files
+            for _, page_entries in file_entries
+            for _, _, json_files in page_entries
+        ]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            page_jsons = iter(list(executor.map(self._load_page_json, all_json_files)))
 
+        raw_outputs = []
+        for file_path, page_entries in file_entries:
+            raw_pages = []
+            for page_path, page_images, _ in page_entries:
+                page_json = next(page_jsons)
                 if page_json is None:
                     raise RuntimeError(f"文件 {page_path} 中没有有效的 JSON 文件")
 
@@ -155,6 +459,30 @@ class PaddleOCRRunner:
 
         return raw_outputs
 
+    @staticmethod
+    def _load_page_json(json_files: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        按顺序尝试加载页面 JSON，返回第一个有效结果
+
+        Args:
+            json_files: 候选 JSON 文件路径列表
+
+        Returns:
+            页面 JSON 数据，全部无效时返回 None
+        """
+        for json_file in json_files:
+            if os.path.isdir(json_file):
+                continue
+
+            try:
+                with open(json_file, 'rb') as f:
+                    return json.loads(f.read())
+            except (json.JSONDecodeError, UnicodeDecodeError, IOError) as e:
+                print(f"⚠️ 加载 JSON 文件失败 {json_file}: {str(e)}")
+                continue
+
+        return None
+
     @staticmethod
     def _convert_to_raw_page(
         page_json: Dict[str, Any], image_paths: List[str]
@@ -198,3 +526,6 @@ class PaddleOCRRunner:
             image_paths=image_paths,
             raw_json=page_json
         )
+
+
+atexit.register(PaddleOCRRunner.close_all)
@@ -13,7 +13,7 @@ from typing import Any, Literal
 from backend.llm.table_parse_router import TableType
 
 
-@dataclass
+@dataclass(slots=True)
 class RawBlock:
     """OCR引擎输出的原始块（引擎无关）"""
     block_id: int
@@ -24,7 +24,7 @@ class RawBlock:
     metadata: dict[str, Any] = field(default_factory=dict)  # 引擎特定元数据
 
 
-@dataclass
+@dataclass(slots=True)
 class RawPageOutput:
     """单页的原始OCR输出（引擎无关）"""
     page_index: int
@@ -35,7 +35,7 @@ class RawPageOutput:
     raw_json: str | None = None  # 保留原始JSON
 
 
-@dataclass
+@dataclass(slots=True)
 class RawFileOutput:
     """单个文件的原始OCR输出（引擎无关）"""
     input_path: str
@@ -47,7 +47,7 @@ class RawFileOutput:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class TextRegion:
     """OCR 识别出的单个文本区域，是 RawOCRResult 的最小单元。
 
@@ -62,7 +62,7 @@ class TextRegion:
     block_index: int | None = None  # 在当前页中的块序号（从上到下，0-based）
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonalInfo:
     """体检报告个人信息"""
     name: str | None = None
@@ -71,7 +71,7 @@ class PersonalInfo:
     exam_date: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PositiveFinding:
     """阳性/异常发现"""
     text: str
@@ -79,7 +79,7 @@ class PositiveFinding:
     type: Literal['检验异常', '影像异常', '诊断结论', '医生建议', '复查建议']
 
 
-@dataclass
+@dataclass(slots=True)
 class TextAnalysis:
     """体检报告文本分析结果"""
     has_abnormal_findings: bool
@@ -92,7 +92,7 @@ class TextAnalysis:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class TableItem:
     """表格中的单条检验项目。"""
 
@@ -106,7 +106,7 @@ class TableItem:
     reference_range: str = ""  # 原始参考值字符串，如"115-150"
 
 
-@dataclass
+@dataclass(slots=True)
 class Table:
     """一张检验 / 检查表格。"""
 
@@ -118,7 +118,7 @@ class Table:
     types: list[TableType] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Image:
     """页面中提取的图片。"""
 
@@ -132,7 +132,7 @@ class Image:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class Page:
     """单页的 OCR 原始输出。"""
 
@@ -159,7 +159,7 @@ class Page:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class OCRResult:
     """一份原始文件经 OCRRunner 处理后的完整中间结构。
 
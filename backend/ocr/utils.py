@@ -4,11 +4,54 @@
 可被多个 OCR 模型复用
 """
 
+import bisect
 import html
+import re
+from functools import lru_cache
 from typing import Optional, Dict, List, Any, Tuple
-from bs4 import BeautifulSoup, Tag
-
-
+from lxml import etree
+
+# 转义字符映射表
+_ESCAPE_MAP = {
+    r'\uparrow ': '↑ ',      # 上箭头
+    r'\downarrow ': '↓ ',    # 下箭头
+    r'\times ': ' × ',        # 乘号
+    r'\mu ': 'μ',           # 删除\m
+    r'\gamma ': 'γ',
+}
+# 所有转义序列合并为一个交替模式，单次扫描完成替换
+_ESCAPE_RE = re.compile('|'.join(re.escape(seq) for seq in _ESCAPE_MAP))
+
+# 模块级复用的 HTML 解析器；注释节点在解析时直接丢弃
+_HTML_PARSER = etree.HTMLParser(remove_comments=True)
+
+# 行分类关键词，模块加载时构建一次，避免每行判断时重复创建列表
+_HEADER_KEYWORDS = ('项目名称', '检验项目', '检查项目', '指标', '项目',
+                    '检查结果', '测定值', '实测值', '结果',
+                    '参考值', '参考范围', '正常值', '参考区间',
+                    '单位', '计量单位')
+# footer 组合匹配：第一部分为动作/角色词，第二部分为后缀词
+_FOOTER_ACTION_KEYWORDS = ('检验', '检查', '审核', '报告', '核对', '医师', '医生')
+_FOOTER_SUFFIX_KEYWORDS = ('者', '医生', '日期', '时间')
+# 医疗检查类别关键词（title 行辅助判断）
+_TITLE_KEYWORDS = ('血常规', '尿常规', '肝功能', '肾功能', '血糖', '血脂',
+                   '心电图', '胸片', 'CT', 'B 超', '肿瘤标志物',
+                   '激素', '免疫', '凝血', '生化', '肝炎', '乙肝',
+                   '甲功', '糖化', '离子', '心肌酶', '贫血')
+# 双栏布局左右两侧共有的 header 关键词
+_DOUBLE_COLUMN_KEYWORDS = ('项目名称', '结果', '参考值', '单位')
+
+
+def _apply_escapes(text: str) -> str:
+    """将文本中的转义序列替换为正常字符"""
+    # 绝大多数文本不含转义序列：先做一次 C 层子串查找，命中才走正则替换
+    if not text or '\\' not in text:
+        return text
+
+    return _ESCAPE_RE.sub(lambda m: _ESCAPE_MAP[m.group(0)], text)
+
+
+@lru_cache(maxsize=1024)
 def table_html_clean(table_html: str) -> str:
     """
     清洗 HTML 中的转义字符，将其转换为正常字符
@@ -19,48 +62,42 @@ def table_html_clean(table_html: str) -> str:
     Returns:
         清洗后的 HTML 字符串
     """
-    if not table_html:
-        return table_html
-
-    # 定义转义字符映射表
-    escape_map = {
-        r'\uparrow ': '↑ ',      # 上箭头
-        r'\downarrow ': '↓ ',    # 下箭头
-        r'\times ': ' × ',        # 乘号
-        r'\mu ': 'μ',           # 删除\m
-        r'\gamma ': 'γ',
-    }
+    return _apply_escapes(table_html)
+
+
+def _cell_text(cell: etree._Element) -> str:
+    """单元格文本：各文本片段替换转义序列、去除首尾空白后直接拼接"""
+    return html.unescape(''.join(_apply_escapes(s).strip() for s in cell.itertext()))
+
 
-    # 逐个替换转义字符
-    cleaned_html = table_html
-    for escape_seq, normal_char in escape_map.items():
-        cleaned_html = cleaned_html.replace(escape_seq, normal_char)
+# span 属性取开头的数字部分，OCR 输出中偶有 "2;"、"" 等不规范写法
+_SPAN_RE = re.compile(r'\s*(\d+)')
 
-    return cleaned_html
 
+def _span(cell: etree._Element, name: str) -> int:
+    """读取 rowspan/colspan，缺失、非数字或 0 时按 1 处理"""
+    match = _SPAN_RE.match(cell.get(name, ''))
+    return max(1, int(match.group(1))) if match else 1
 
-def _build_matrix(table: Tag) -> List[List[str]]:
+
+def _build_matrix(table: etree._Element) -> List[List[str]]:
     """
     解析 HTML 表格，构建二维矩阵，处理 rowspan 和 colspan
 
     Args:
-        table: BeautifulSoup 的 table 标签
+        table: lxml 的 table 元素
 
     Returns:
         二维矩阵，每个元素是单元格文本
     """
-    rows = table.find_all('tr')
+    rows = list(table.iter('tr'))
     if not rows:
         return []
 
-    # 先确定矩阵的最大行列数
-    max_cols = 0
-    for tr in rows:
-        col_count = 0
-        for cell in tr.find_all(['td', 'th']):
-            colspan = int(cell.get('colspan', 1))
-            col_count += colspan
-        max_cols = max(max_cols, col_count)
+    # 一次遍历预解析每个单元格的 rowspan/colspan，并确定矩阵的最大列数
+    row_cells = [[(cell, _span(cell, 'rowspan'), _span(cell, 'colspan')) for cell in tr.iter('td', 'th')]
+                 for tr in rows]
+    max_cols = max(sum(colspan for _, _, colspan in cells) for cells in row_cells)
 
     # 初始化矩阵（用空字符串填充）
     matrix: List[List[str]] = [['' for _ in range(max_cols)] for _ in range(len(rows))]
@@ -68,9 +105,9 @@ def _build_matrix(table: Tag) -> List[List[str]]:
     # 记录每行每列是否被占用（处理 rowspan）
     occupied: List[List[bool]] = [[False for _ in range(max_cols)] for _ in range(len(rows))]
 
-    for row_idx, tr in enumerate(rows):
+    for row_idx, cells in enumerate(row_cells):
         col_idx = 0
-        for cell in tr.find_all(['td', 'th']):
+        for cell, rowspan, colspan in cells:
             # 跳过被 rowspan 占用的位置
             while col_idx < max_cols and occupied[row_idx][col_idx]:
                 col_idx += 1
@@ -78,10 +115,7 @@ def _build_matrix(table: Tag) -> List[List[str]]:
             if col_idx >= max_cols:
                 break
 
-            # 获取单元格属性
-            rowspan = int(cell.get('rowspan', 1))
-            colspan = int(cell.get('colspan', 1))
-            text = html.unescape(cell.get_text(strip=True))
+            text = _cell_text(cell)
 
             # 方案 A：rowspan 向下重复填充，colspan 不向右填充
             # rowspan 需要填充：因为每行都需要这个值
@@ -109,14 +143,9 @@ def _is_header_row(row: List[str]) -> bool:
     Returns:
         是否为 header 行
     """
-    header_keywords = ['项目名称', '检验项目', '检查项目', '指标', '项目',
-                       '检查结果', '测定值', '实测值', '结果',
-                       '参考值', '参考范围', '正常值', '参考区间',
-                       '单位', '计量单位']
-
     row_text = ''.join(row).lower()
     # 至少匹配 2 个关键词才认为是 header
-    match_count = sum(1 for kw in header_keywords if kw in row_text)
+    match_count = sum(1 for kw in _HEADER_KEYWORDS if kw in row_text)
     return match_count >= 2
 
 
@@ -131,17 +160,11 @@ def _is_footer_row(row: List[str]) -> bool:
     Returns:
         是否为 footer 行
     """
-    # 第一部分：动作/角色词
-    action_keywords = ['检验', '检查', '审核', '报告', '核对', '医师', '医生']
-    
-    # 第二部分：后缀词
-    suffix_keywords = ['者', '医生', '日期', '时间']
-    
     row_text = ''.join(row)
     
     # 检查是否同时包含两部分关键词（组合匹配）
-    has_action = any(kw in row_text for kw in action_keywords)
-    has_suffix = any(kw in row_text for kw in suffix_keywords)
+    has_action = any(kw in row_text for kw in _FOOTER_ACTION_KEYWORDS)
+    has_suffix = any(kw in row_text for kw in _FOOTER_SUFFIX_KEYWORDS)
     
     return has_action and has_suffix
 
@@ -182,11 +205,7 @@ def _is_colspan_separator_row(row: List[str], matrix_row_idx: int, matrix: List[
                 return True
 
     # 内容特征：包含医疗检查类别关键词（辅助判断）
-    title_keywords = ['血常规', '尿常规', '肝功能', '肾功能', '血糖', '血脂',
-                      '心电图', '胸片', 'CT', 'B 超', '肿瘤标志物',
-                      '激素', '免疫', '凝血', '生化', '肝炎', '乙肝',
-                      '甲功', '糖化', '离子', '心肌酶', '贫血']
-    return any(kw in separator_text for kw in title_keywords)
+    return any(kw in separator_text for kw in _TITLE_KEYWORDS)
 
 
 def _detect_segments(matrix: List[List[str]]) -> List[Dict[str, Any]]:
@@ -292,54 +311,36 @@ def _split_tables_by_segments(matrix: List[List[str]], segments: List[Dict[str,
     if not matrix:
         return []
 
-    # 找到所有拆分点
-    split_points = []
-    for i, seg in enumerate(segments):
-        if seg.get('split_table') or seg.get('new_table'):
-            split_points.append((i, seg['row_index']))
+    # 子表格起始行：split_table 行是 colspan 分隔行，作为新表格的 title；
+    # new_table 只是新的 header，不需要拆分
+    starts = [0]
+    for seg in segments:
+        if seg.get('split_table') and seg['row_index'] > starts[-1]:
+            starts.append(seg['row_index'])
 
-    if not split_points:
+    if len(starts) == 1 and not any(seg.get('split_table') for seg in segments):
         # 没有拆分点，返回完整表格
         return [(matrix, segments)]
 
+    # 一次遍历把分段分配到所属子表格，行号改为子表格内的相对行号
+    grouped: List[List[Dict[str, Any]]] = [[] for _ in starts]
+    for seg in segments:
+        table_idx = bisect.bisect_right(starts, seg['row_index']) - 1
+        if table_idx >= 0:
+            grouped[table_idx].append({**seg, 'row_index': seg['row_index'] - starts[table_idx]})
+
     tables = []
-    start_row = 0
-
-    for seg_idx, split_row in split_points:
-        # 找到 split_table 类型的 segment，它应该是新表格的 title
-        seg = segments[seg_idx]
-        
-        # 如果是 split_table，表示这行是 colspan 分隔行，应该作为新表格的 title
-        if seg.get('split_table'):
-            # 当前表格不包含 title 行
-            end_row = split_row
-            if end_row > start_row:
-                sub_matrix = matrix[start_row:end_row]
-                sub_segments = [
-                    {**s, 'row_index': s['row_index'] - start_row}
-                    for s in segments if start_row <= s['row_index'] < end_row
-                ]
-                tables.append((sub_matrix, sub_segments))
-            
-            # 新表格从 title 行开始
-            start_row = split_row
-        else:
-            # new_table: 只是新的 header，不需要拆分
-            pass
-
-    # 处理最后一个表格（包含 title 行）
-    if start_row < len(matrix):
-        sub_matrix = matrix[start_row:]
-        sub_segments = [
-            {**s, 'row_index': s['row_index'] - start_row}
-            for s in segments if s['row_index'] >= start_row
-        ]
-        # 将第一个 segment 标记为 title（如果它是 split_table）
-        if sub_segments and sub_segments[0].get('split_table'):
-            sub_segments[0]['type'] = 'title'
-            if 'split_table' in sub_segments[0]:
-                del sub_segments[0]['split_table']
-        tables.append((sub_matrix, sub_segments))
+    for table_idx, start_row in enumerate(starts):
+        if start_row >= len(matrix):
+            break
+        end_row = starts[table_idx + 1] if table_idx + 1 < len(starts) else len(matrix)
+        tables.append((matrix[start_row:end_row], grouped[table_idx]))
+
+    # 最后一个表格以 title 行开始：将其第一个 segment 标记为 title（如果它是 split_table）
+    last_segments = grouped[-1]
+    if starts[-1] < len(matrix) and last_segments and last_segments[0].get('split_table'):
+        last_segments[0]['type'] = 'title'
+        del last_segments[0]['split_table']
 
     return tables
 
@@ -373,13 +374,20 @@ def _is_double_column(matrix: List[List[str]]) -> bool:
     left_text = ' '.join(left_part)
     right_text = ' '.join(right_part)
 
-    common_keywords = ['项目名称', '结果', '参考值', '单位']
-    left_matches = sum(1 for kw in common_keywords if kw in left_text)
-    right_matches = sum(1 for kw in common_keywords if kw in right_text)
+    left_matches = sum(1 for kw in _DOUBLE_COLUMN_KEYWORDS if kw in left_text)
+    right_matches = sum(1 for kw in _DOUBLE_COLUMN_KEYWORDS if kw in right_text)
 
     return left_matches >= 2 and right_matches >= 2
 
 
+def _segments_by_row(segments: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """按行索引建立分段查找表，同一行有多个分段时取第一个"""
+    seg_by_row: Dict[int, Dict[str, Any]] = {}
+    for seg in segments:
+        seg_by_row.setdefault(seg['row_index'], seg)
+    return seg_by_row
+
+
 def _matrix_to_html(matrix: List[List[str]], segments: List[Dict[str, Any]]) -> str:
     """
     将矩阵和分段信息转换为 HTML 表格字符串（不包含 footer 行）
@@ -395,34 +403,27 @@ def _matrix_to_html(matrix: List[List[str]], segments: List[Dict[str, Any]]) ->
         return ''
 
     html_lines = ['<table>']
+    seg_by_row = _segments_by_row(segments)
 
     for row_idx, row in enumerate(matrix):
-        seg = next((s for s in segments if s['row_index'] == row_idx), None)
+        seg = seg_by_row.get(row_idx)
 
         if seg and seg['type'] == 'title':
             # title 行：使用 colspan 跨越所有列
             title_text = seg.get('text', row[0].strip() if row else '')
             # 转义 HTML 特殊字符
-            title_text = title_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            title_text = html.escape(title_text, quote=False)
             html_lines.append(f'<tr><td colspan="{len(row)}">{title_text}</td></tr>')
 
         elif seg and seg['type'] == 'header':
-            # header 行：使用 th 标签
-            cells = []
-            for cell in row:
-                # 转义 HTML 特殊字符
-                cell_escaped = cell.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                cells.append(f'<th>{cell_escaped}</th>')
-            html_lines.append(f'<tr>{"".join(cells)}</tr>')
+            # header 行：使用 th 标签（转义 HTML 特殊字符）
+            cells = ''.join([f'<th>{html.escape(cell, quote=False)}</th>' for cell in row])
+            html_lines.append(f'<tr>{cells}</tr>')
 
         elif seg and seg['type'] == 'data':
-            # 数据行：使用 td 标签（跳过 footer）
-            cells = []
-            for cell in row:
-                # 转义 HTML 特殊字符
-                cell_escaped = cell.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                cells.append(f'<td>{cell_escaped}</td>')
-            html_lines.append(f'<tr>{"".join(cells)}</tr>')
+            # 数据行：使用 td 标签（跳过 footer，转义 HTML 特殊字符）
+            cells = ''.join([f'<td>{html.escape(cell, quote=False)}</td>' for cell in row])
+            html_lines.append(f'<tr>{cells}</tr>')
 
         # footer 行：跳过不输出
 
@@ -430,6 +431,17 @@ def _matrix_to_html(matrix: List[List[str]], segments: List[Dict[str, Any]]) ->
     return ''.join(html_lines)
 
 
+def _md_row(row: List[str]) -> str:
+    """单行 Markdown 表格，一次格式化生成"""
+    return f"| {' | '.join(row)} |"
+
+
+@lru_cache(maxsize=32)
+def _md_separator(col_count: int) -> str:
+    """Markdown 表头分隔行，按列数缓存"""
+    return _md_row(['---'] * col_count)
+
+
 def _matrix_to_markdown(matrix: List[List[str]], segments: List[Dict[str, Any]]) -> str:
     """
     将矩阵和分段信息转换为 Markdown 格式（不包含 footer 行）
@@ -445,6 +457,7 @@ def _matrix_to_markdown(matrix: List[List[str]], segments: List[Dict[str, Any]])
         return ''
 
     md_lines = []
+    seg_by_row = _segments_by_row(segments)
     header_found = False
     header_row_idx = -1
 
@@ -456,7 +469,7 @@ def _matrix_to_markdown(matrix: List[List[str]], segments: List[Dict[str, Any]])
             break
 
     for row_idx, row in enumerate(matrix):
-        seg = next((s for s in segments if s['row_index'] == row_idx), None)
+        seg = seg_by_row.get(row_idx)
 
         if seg and seg['type'] == 'title':
             # 使用 segment 中存储的 text，而不是 join 整行（避免 colspan 重复）
@@ -466,17 +479,17 @@ def _matrix_to_markdown(matrix: List[List[str]], segments: List[Dict[str, Any]])
 
         elif seg and seg['type'] == 'header':
             # Markdown 表头
-            md_lines.append('| ' + ' | '.join(row) + ' |')
-            md_lines.append('| ' + ' | '.join(['---'] * len(row)) + ' |')
+            md_lines.append(_md_row(row))
+            md_lines.append(_md_separator(len(row)))
 
         elif seg and seg['type'] == 'data':
             # 数据行（跳过 footer）
             if header_found:
-                md_lines.append('| ' + ' | '.join(row) + ' |')
+                md_lines.append(_md_row(row))
             elif row_idx == 0 and not header_found:
                 # 如果没有 header，第一行当作 header
-                md_lines.append('| ' + ' | '.join(row) + ' |')
-                md_lines.append('| ' + ' | '.join(['---'] * len(row)) + ' |')
+                md_lines.append(_md_row(row))
+                md_lines.append(_md_separator(len(row)))
                 header_found = True
 
     return '\n'.join(md_lines)
@@ -485,6 +498,7 @@ def _matrix_to_markdown(matrix: List[List[str]], segments: List[Dict[str, Any]])
 def table_html_to_md(table_html: str) -> Optional[Dict[str, Any]]:
     """
     将 HTML 表格转换为结构化数据和 Markdown/HTML 格式
+    单元格中的转义序列（如 \\uparrow）在提取文本时一并替换，无需先调用 table_html_clean
 
     Args:
         table_html: HTML 表格字符串
@@ -504,10 +518,19 @@ def table_html_to_md(table_html: str) -> Optional[Dict[str, Any]]:
     if not table_html:
         return None
 
-    soup = BeautifulSoup(table_html, 'lxml')
-    table = soup.find('table')
+    try:
+        # 直接用 etree 解析，跳过 lxml.html.fromstring 的片段判断与二次包装
+        root = etree.fromstring(table_html, _HTML_PARSER)
+    except (etree.ParserError, ValueError):
+        # 带编码声明等无法解析的输入
+        return None
+
+    # 纯空白输入解析结果为 None
+    if root is None:
+        return None
 
-    if not table or not table.find('tr'):
+    table = next(root.iter('table'), None)
+    if table is None or next(table.iter('tr'), None) is None:
         return None
 
     # 步骤 1: 构建矩阵（处理 rowspan/colspan）
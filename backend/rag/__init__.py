@@ -3,5 +3,6 @@ RAG Module — 三路检索编排
 MedicalRAG: 查询改写 → 指标统一化 → 精确匹配 + 向量检索 + rerank
 """
 
+from .cache import SemanticCache
 from .reranker import BGEReranker
 from .retriever import MedicalRAG
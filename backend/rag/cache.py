@@ -0,0 +1,90 @@
+"""
+SemanticCache — 语义缓存
+
+问题向量与已缓存问题的相似度超过阈值即视为命中，直接返回缓存结果。
+BGE-M3 dense 向量已归一化，内积即余弦相似度。
+注意：语义相近不等于语义相同（如"血压高怎么办"与"血压低怎么办"余弦往往 > 0.92），
+阈值需足够严格，并配合 TTL 使条目随数据更新过期。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List
+
+import numpy as np
+
+
+class SemanticCache:
+    """进程内语义缓存：原文完全一致 O(1) 命中，否则做一次矩阵-向量乘找最相似问题；LRU 淘汰
+
+    ttl_seconds 不为空时，条目写入超过该秒数即视为过期，命中时删除并返回未命中
+    """
+
+    def __init__(self, threshold: float = 0.92, max_size: int = 512, ttl_seconds: float | None = None):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # key → (向量, 缓存值, 写入时间)
+        self._entries: "OrderedDict[str, tuple[np.ndarray, Any, float]]" = OrderedDict()
+        # 向量矩阵按 _keys 顺序堆叠，写入/淘汰后失效，查询时懒重建
+        self._keys: List[str] = []
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, vector) -> Any | None:
+        """
+        查询缓存
+
+        Args:
+            key: 原始问题文本
+            vector: 问题的归一化向量
+
+        Returns:
+            命中的缓存值，未命中返回 None
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key)
+
+            if not self._entries:
+                return None
+
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k][0] for k in self._keys])
+
+            scores = self._matrix @ np.asarray(vector, dtype=np.float32)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            return self._hit(self._keys[best])
+
+    def _hit(self, key: str) -> Any | None:
+        """返回命中条目的值；已过期则删除并返回 None（调用方持有锁）"""
+        _, value, stored_at = self._entries[key]
+        if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self._matrix = None
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, vector, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = (np.asarray(vector, dtype=np.float32), value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys = []
+            self._matrix = None
@@ -5,14 +5,41 @@ Reranker 模块
 输入格式：documents 为 list[dict]，每项必须含 "text" 字段
 """
 
+import threading
+
+import torch
 from FlagEmbedding import FlagReranker
 
 
 class BGEReranker:
     """BGE-Reranker 重排序器"""
 
-    def __init__(self, model_name: str = "BAAI/bge-reranker-v2-m3", use_fp16: bool = True):
-        self.reranker = FlagReranker(model_name, use_fp16=use_fp16)
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-v2-m3",
+        use_fp16: bool = True,
+        quantize: bool = False,
+    ):
+        """
+        Args:
+            model_name: 模型名称或本地路径
+            use_fp16: GPU 上使用 FP16 推理
+            quantize: 在 CPU 上以动态 INT8 量化 Linear 层运行（无 GPU 部署时使用，
+                GPU 上 FP16 已足够快，不建议开启）
+        """
+        self.reranker = FlagReranker(model_name, use_fp16=use_fp16 and not quantize)
+        if quantize:
+            self._quantize_dynamic_int8()
+        # 端点在线程池中并发执行，fast tokenizer 不支持并发调用
+        self._lock = threading.Lock()
+
+    def _quantize_dynamic_int8(self):
+        """Linear 层权重转为 INT8，激活在运行时动态量化；仅支持 CPU"""
+        model = self.reranker.model.float().cpu()
+        self.reranker.model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        self.reranker.device = torch.device("cpu")
 
     def rerank(self, query: str, documents: list[dict], top_k: int | None = None) -> list[dict]:
         """
@@ -30,7 +57,8 @@ class BGEReranker:
             return []
 
         pairs = [[query, doc.get("text", "")] for doc in documents]
-        scores = self.reranker.compute_score(pairs, normalize=True)
+        with self._lock, torch.inference_mode():
+            scores = self.reranker.compute_score(pairs, normalize=True)
 
         if isinstance(scores, float):
             scores = [scores]
@@ -10,8 +10,15 @@ MedicalRAG — 三路检索编排
    C. knowledge_chunks + medical_qa 向量检索 → rerank → 各取 top 3
 """
 
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List
 
+import numpy as np
 from pymilvus import MilvusClient
 
 from backend.llm import QueryRewriter
@@ -19,12 +26,32 @@ from backend.llm.utils import medical_term_normalizer
 from backend.vector.config import MilvusLiteConfig
 from backend.vector.embeddings import BGEM3Embedder
 
+from .cache import SemanticCache
 from .reranker import BGEReranker
 
+# 各路只取下游（场景格式化、去重、前端展示）用到的标量字段，
+# 避免 "*" 把 dense/sparse 向量一并拉回并序列化给前端
+_REPORT_ITEM_FIELDS = [
+    "report_source", "exam_date", "page_index", "table_title",
+    "item", "result", "unit", "abnormal", "reference_range",
+]
+_REPORT_PAGE_FIELDS = ["report_source", "exam_date", "page_index", "summary_text", "page_data_json"]
+
 
 class MedicalRAG:
     """体检报告 RAG 检索器"""
 
+    # 查询向量 LRU 缓存容量；常见问题与改写后的查询高度重复，命中时跳过 BGE-M3 前向
+    embedding_cache_size: int = 1024
+    # 知识库/问答检索结果缓存：与用户无关，改写后查询相同或极相似（余弦 ≥ 阈值）时
+    # 直接复用检索 + rerank 结果；报告相关路径随用户数据变化，不缓存
+    retrieval_cache_size: int = 2048
+    retrieval_cache_threshold: float = 0.97
+    # 检索结果缓存过期时间，入库新数据后旧结果最多保留该时长（refresh_collection_status 立即清空）
+    retrieval_cache_ttl_seconds: float = 600.0
+    # 无数据的 collection 跳过检索；超过该秒数后再次探测，运行期入库的数据随之生效
+    empty_recheck_seconds: float = 30.0
+
     def __init__(
         self,
         client: MilvusClient,
@@ -37,6 +64,64 @@ class MedicalRAG:
         self.embedder = embedder or BGEM3Embedder()
         self.query_rewriter = query_rewriter  # lazily loaded
         self.reranker = reranker or BGEReranker()
+        # 检索各路径以 Milvus IO 为主，用线程池并发执行并与向量编码重叠；
+        # 单次检索最多提交 4 路，留出余量给并发请求
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag")
+        # 查询向量缓存：key 为去除首尾空白后的查询文本
+        self._embedding_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        # 按 (collection, retrieve_k, rerank_k) 各一份，语义匹配只在同参数的结果间进行
+        self._retrieval_caches: Dict[tuple, SemanticCache] = {}
+        self._retrieval_caches_lock = threading.Lock()
+        # 无数据的 collection 直接跳过检索（如尚未上传体检报告）
+        # collection → 判定为空时的探测时间
+        self._empty_collections: Dict[str, float] = {}
+        self.refresh_collection_status()
+
+    def refresh_collection_status(self):
+        """重新探测各 collection 是否有数据并清空检索结果缓存；入库新数据后调用可立即生效"""
+        self.clear_retrieval_caches()
+        empty = {}
+        for collection in (
+            self.cfg.COLLECTION_REPORT_PAGES,
+            self.cfg.COLLECTION_REPORT_ITEMS,
+            self.cfg.COLLECTION_KNOWLEDGE_CHUNKS,
+            self.cfg.COLLECTION_MEDICAL_QA,
+        ):
+            if self._probe_empty(collection):
+                empty[collection] = time.monotonic()
+        self._empty_collections = empty
+        if empty:
+            print(f"[MedicalRAG] 以下 collection 无数据，检索时跳过: {sorted(empty)}")
+
+    def _probe_empty(self, collection: str) -> bool:
+        """collection 中没有任何数据时返回 True"""
+        try:
+            rows = self.client.query(
+                collection_name=collection,
+                filter="pk > 0",
+                output_fields=["pk"],
+                limit=1,
+            )
+        except Exception:
+            # 探测失败时照常检索，由检索本身报告错误
+            return False
+        return not rows
+
+    def _is_empty(self, collection: str) -> bool:
+        """是否跳过该 collection；判定为空已超过 empty_recheck_seconds 时重新探测"""
+        checked_at = self._empty_collections.get(collection)
+        if checked_at is None:
+            return False
+        if time.monotonic() - checked_at < self.empty_recheck_seconds:
+            return True
+        if self._probe_empty(collection):
+            self._empty_collections[collection] = time.monotonic()
+            return True
+        self._empty_collections.pop(collection, None)
+        self.clear_retrieval_caches(collection)
+        print(f"[MedicalRAG] collection 已有数据，恢复检索: {collection}")
+        return False
 
     def _get_query_rewriter(self) -> QueryRewriter:
         if self.query_rewriter is None:
@@ -48,47 +133,70 @@ class MedicalRAG:
         """用 MedicalTermNormalizer 统一化指标名"""
         return medical_term_normalizer.normalize_list(indicators)
 
-    def _get_embedding(self, text: str) -> List[float]:
-        return self.embedder.encode_dense([text])[0]
+    def embed_query(self, text: str) -> np.ndarray:
+        """编码查询文本为 Dense 向量，相同查询直接返回缓存结果"""
+        key = text.strip()
+        with self._embedding_cache_lock:
+            cached = self._embedding_cache.get(key)
+            if cached is not None:
+                self._embedding_cache.move_to_end(key)
+                return cached
+
+        vector = self.embedder.encode_query(key)
+
+        with self._embedding_cache_lock:
+            self._embedding_cache[key] = vector
+            if len(self._embedding_cache) > self.embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+        return vector
 
     # ---------- 路径 A: report_items 精确匹配 ----------
 
     def _retrieve_report_items(self, indicators: List[str]) -> List[Dict]:
-        """返回全部匹配的检验项目"""
-        if not indicators:
+        """返回全部匹配的检验项目（所有指标合并为一次 in 查询）"""
+        if not indicators or self._is_empty(self.cfg.COLLECTION_REPORT_ITEMS):
             return []
 
+        try:
+            results = self.client.query(
+                collection_name=self.cfg.COLLECTION_REPORT_ITEMS,
+                filter=f"item in {json.dumps(indicators, ensure_ascii=False)}",
+                output_fields=_REPORT_ITEM_FIELDS,
+            )
+        except Exception as e:
+            print(f"[MedicalRAG] report_items 查询失败 (indicators={indicators}): {e}")
+            return []
+
+        # 按指标顺序分组输出，与逐指标查询时的顺序一致
+        rows_by_item: Dict[str, List[Dict]] = {ind: [] for ind in indicators}
+        for row in results:
+            rows_by_item.setdefault(row.get("item"), []).append(row)
+
         all_items = []
         seen = set()
-
-        for ind in indicators:
-            try:
-                results = self.client.query(
-                    collection_name=self.cfg.COLLECTION_REPORT_ITEMS,
-                    filter=f'item == "{ind}"',
-                    output_fields=["*"],
-                )
-                for row in results:
-                    key = f"{row.get('report_source')}_{row.get('page_index')}_{row.get('item')}"
-                    if key not in seen:
-                        seen.add(key)
-                        all_items.append(row)
-            except Exception as e:
-                print(f"[MedicalRAG] report_items 查询失败 (indicator={ind}): {e}")
+        for rows in rows_by_item.values():
+            for row in rows:
+                key = f"{row.get('report_source')}_{row.get('page_index')}_{row.get('item')}"
+                if key not in seen:
+                    seen.add(key)
+                    all_items.append(row)
 
         return all_items
 
     # ---------- 路径 B: report_pages 向量检索 ----------
 
-    def _retrieve_report_page(self, query_vec: List[float]) -> Dict | None:
+    def _retrieve_report_page(self, query_vec: np.ndarray) -> Dict | None:
         """向量检索 report_pages → 按 exam_date 降序取最近一份"""
+        if self._is_empty(self.cfg.COLLECTION_REPORT_PAGES):
+            return None
+
         try:
             results = self.client.search(
                 collection_name=self.cfg.COLLECTION_REPORT_PAGES,
                 data=[query_vec],
                 anns_field="summary_dense",
                 limit=10,
-                output_fields=["*"],
+                output_fields=_REPORT_PAGE_FIELDS,
             )[0]  # 取第一条查询结果
         except Exception as e:
             print(f"[MedicalRAG] report_pages 向量检索失败: {e}")
@@ -119,7 +227,7 @@ class MedicalRAG:
     def _retrieve_and_rerank(
         self,
         query: str,
-        query_vec: List[float],
+        query_vec: np.ndarray,
         collection: str,
         anns_field: str,
         output_fields: List[str],
@@ -127,7 +235,53 @@ class MedicalRAG:
         rerank_k: int = 3,
         text_field: str = "text",
     ) -> List[Dict]:
-        """通用：向量检索 → 转为通用格式 → rerank → top k"""
+        """通用：向量检索 → 转为通用格式 → rerank → top k，结果经语义缓存复用"""
+        if self._is_empty(collection):
+            return []
+
+        cache = self._get_retrieval_cache((collection, retrieve_k, rerank_k))
+        cached = cache.get(query, query_vec)
+        if cached is not None:
+            # 深拷贝：下游修改结果不会污染缓存
+            return copy.deepcopy(cached)
+
+        docs = self._search_docs(query_vec, collection, anns_field, output_fields, retrieve_k, text_field)
+        if not docs:
+            # 检索失败或无结果不写缓存，新入库的数据可立即被检索到
+            return []
+        reranked = self.reranker.rerank(query, docs, top_k=rerank_k)
+        cache.put(query, query_vec, copy.deepcopy(reranked))
+        return reranked
+
+    def _get_retrieval_cache(self, key: tuple) -> SemanticCache:
+        with self._retrieval_caches_lock:
+            cache = self._retrieval_caches.get(key)
+            if cache is None:
+                cache = SemanticCache(
+                    threshold=self.retrieval_cache_threshold,
+                    max_size=self.retrieval_cache_size,
+                    ttl_seconds=self.retrieval_cache_ttl_seconds,
+                )
+                self._retrieval_caches[key] = cache
+            return cache
+
+    def clear_retrieval_caches(self, collection: str | None = None):
+        """清空检索结果缓存；collection 为空时清空全部"""
+        with self._retrieval_caches_lock:
+            for key, cache in self._retrieval_caches.items():
+                if collection is None or key[0] == collection:
+                    cache.clear()
+
+    def _search_docs(
+        self,
+        query_vec: np.ndarray,
+        collection: str,
+        anns_field: str,
+        output_fields: List[str],
+        retrieve_k: int,
+        text_field: str,
+    ) -> List[Dict] | None:
+        """向量检索并转为通用格式（text 字段 + _distance），检索失败返回 None"""
         try:
             results = self.client.search(
                 collection_name=collection,
@@ -138,7 +292,7 @@ class MedicalRAG:
             )[0]
         except Exception as e:
             print(f"[MedicalRAG] {collection} 检索失败: {e}")
-            return []
+            return None
 
         if not results:
             return []
@@ -153,7 +307,7 @@ class MedicalRAG:
             doc["_distance"] = hit.get("distance", 0) if isinstance(hit, dict) else 0
             docs.append(doc)
 
-        return self.reranker.rerank(query, docs, top_k=rerank_k)
+        return docs
 
     # ---------- 主入口 ----------
 
@@ -208,21 +362,25 @@ class MedicalRAG:
                 "medical_qa": [],
             }
 
+        # 路径 A: 精确匹配 report_items，不依赖向量，先提交与编码并行
+        report_items_future = None
+        if need_report and indicators:
+            report_items_future = self._executor.submit(self._retrieve_report_items, indicators)
+
         # Step 3: 生成向量（一次，共用）
-        query_vec = self._get_embedding(rewritten)
+        query_vec = self.embed_query(rewritten)
 
-        # 路径 A: 精确匹配 report_items
-        report_items = []
-        if need_report and indicators:
-            report_items = self._retrieve_report_items(indicators)
+        # 路径 B / C1 / C2 互相独立，Milvus 检索并发执行；
+        # rerank 模型自带锁，各路的 rerank 仍依次进行
 
         # 路径 B: 向量检索 report_pages → 最近一份
-        report_page = None
+        report_page_future = None
         if need_report:
-            report_page = self._retrieve_report_page(query_vec)
+            report_page_future = self._executor.submit(self._retrieve_report_page, query_vec)
 
         # 路径 C1: knowledge_chunks（始终检索 10 条，rerank 后取 knowledge_rerank_k 条）
-        knowledge_chunks = self._retrieve_and_rerank(
+        knowledge_future = self._executor.submit(
+            self._retrieve_and_rerank,
             query=rewritten,
             query_vec=query_vec,
             collection=self.cfg.COLLECTION_KNOWLEDGE_CHUNKS,
@@ -234,19 +392,26 @@ class MedicalRAG:
         )
 
         # 路径 C2: medical_qa（报告模式下跳过）
-        medical_qa = []
+        medical_qa_future = None
         if not skip_qa:
-            medical_qa = self._retrieve_and_rerank(
+            medical_qa_future = self._executor.submit(
+                self._retrieve_and_rerank,
                 query=rewritten,
                 query_vec=query_vec,
                 collection=self.cfg.COLLECTION_MEDICAL_QA,
                 anns_field="summary_dense",
-                output_fields=["summary", "document", "department", "text"],
+                # 正文取 document，text 字段未被使用
+                output_fields=["summary", "document", "department"],
                 retrieve_k=10,
                 rerank_k=3,
                 text_field="document",
             )
 
+        report_page = report_page_future.result() if report_page_future else None
+        knowledge_chunks = knowledge_future.result()
+        medical_qa = medical_qa_future.result() if medical_qa_future else []
+        report_items = report_items_future.result() if report_items_future else []
+
         return {
             "rewritten_query": rewritten,
             "need_report": need_report,
@@ -4,7 +4,7 @@ BaseScenario — 场景基类
 """
 
 import tomllib
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
@@ -28,34 +28,32 @@ class BaseScenario:
         )
 
     def _build_chain(self):
-        template = ChatPromptTemplate.from_messages([
+        self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", self.system_content),
             ("user", self.user_template),
         ])
-        return template | RunnableLambda(self.llm.invoke) | StrOutputParser()
+        return self.prompt_template | RunnableLambda(self.llm.invoke) | StrOutputParser()
 
     # ---------- 默认 Context 格式化（问答场景） ----------
 
+    @staticmethod
+    def _format_report_item_line(item: Dict) -> str:
+        ref = item.get("reference_range", "")
+        abnormal = item.get("abnormal", "")
+        table = item.get("table_title", "")
+        return "".join((
+            f"- {item.get('item', 'N/A')}: {item.get('result', '')} {item.get('unit', '')}",
+            f" (参考范围: {ref})" if ref else "",
+            f" [异常: {abnormal}]" if abnormal else "",
+            f"（来自{table}）" if table else "",
+        ))
+
     @staticmethod
     def _format_report_items(report_items: List[Dict]) -> str:
         if not report_items:
             return ""
         lines = ["【用户体检报告相关指标】"]
-        for item in report_items:
-            name = item.get("item", "N/A")
-            result = item.get("result", "")
-            unit = item.get("unit", "")
-            ref = item.get("reference_range", "")
-            abnormal = item.get("abnormal", "")
-            table = item.get("table_title", "")
-            line = f"- {name}: {result} {unit}"
-            if ref:
-                line += f" (参考范围: {ref})"
-            if abnormal:
-                line += f" [异常: {abnormal}]"
-            if table:
-                line += f"（来自{table}）"
-            lines.append(line)
+        lines.extend([BaseScenario._format_report_item_line(item) for item in report_items])
         return "\n".join(lines) + "\n"
 
     @staticmethod
@@ -116,3 +114,13 @@ class BaseScenario:
             "context": context,
             "question": question,
         })
+
+    def stream(self, retrieval: Dict[str, Any], question: str, history: str = "") -> Iterator[str]:
+        """与 invoke 使用相同 Prompt，逐段产出 LLM 回复"""
+        context = self.format_context(retrieval)
+        prompt_value = self.prompt_template.invoke({
+            "history": history,
+            "context": context,
+            "question": question,
+        })
+        yield from self.llm.stream_invoke(prompt_value)
@@ -83,14 +83,11 @@ class ReportScenario(BaseScenario):
         header = "| 项目 | 结果 | 单位 | 参考范围 | 异常 | 来源 |"
         sep = "|------|------|------|----------|------|------|"
         rows = [header, sep]
-        for item in items:
-            name = item.get("item", "")
-            result = item.get("result", "")
-            unit = item.get("unit", "")
-            ref = item.get("reference_range", "")
-            abnormal = item.get("abnormal", "")
-            table = item.get("table_title", "")
-            rows.append(f"| {name} | {result} | {unit} | {ref} | {abnormal} | {table} |")
+        rows.extend([
+            f"| {item.get('item', '')} | {item.get('result', '')} | {item.get('unit', '')} "
+            f"| {item.get('reference_range', '')} | {item.get('abnormal', '')} | {item.get('table_title', '')} |"
+            for item in items
+        ])
 
         lines.extend(rows)
         return "\n".join(lines) + "\n"
@@ -5,11 +5,23 @@ BGE-M3 嵌入模型包装器
 """
 
 import os
-from typing import Dict, List
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
 
+import numpy as np
+import torch
 from FlagEmbedding import BGEM3FlagModel
 
 _bgem3_instance = None
+# 单例模型被多个请求线程共享，fast tokenizer 不支持并发调用，编码需串行
+# 编码均在 torch.inference_mode() 下执行：纯推理，省去 autograd 版本计数开销
+_encode_lock = threading.Lock()
+
+# 每个模型一个查询合并器，按 id(model) 索引：批处理只合并同一模型的请求
+_query_batchers: Dict[int, "_QueryBatcher"] = {}
+_query_batcher_lock = threading.Lock()
 
 
 def get_bgem3_model(device: str = "cuda") -> BGEM3FlagModel:
@@ -27,23 +39,98 @@ def get_bgem3_model(device: str = "cuda") -> BGEM3FlagModel:
     return _bgem3_instance
 
 
+class _QueryBatcher:
+    """
+    合并并发的单条查询编码请求
+
+    后台线程每次取出队列中已有的全部请求（最多 max_batch 条）一次编码，不额外等待：
+    编码进行期间到达的请求自然积攒为下一批，单请求时延迟不变，并发时 GPU 以批处理运行
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch: int = 32):
+        self._encode_fn = encode_fn
+        self._max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        threading.Thread(target=self._loop, name="bgem3-query-batcher", daemon=True).start()
+
+    def submit(self, text: str) -> np.ndarray:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self._encode_fn([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            # 逐行拷贝，避免缓存中的单条向量引用整批矩阵
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector.copy())
+
+
 class BGEM3Embedder:
     """BGE-M3 编码器：同时输出 Dense 和 Sparse 向量"""
 
+    # 查询都是短句，按 512 token 截断，padding 长度远小于文档编码
+    QUERY_MAX_LENGTH = 512
+
     def __init__(self, device: str = "cuda"):
         self.model = get_bgem3_model(device)
 
-    def encode_dense(self, texts: List[str], batch_size: int = 12) -> List[List[float]]:
-        """仅生成 Dense 向量"""
+    def encode_dense(
+        self,
+        texts: List[str],
+        batch_size: int = 12,
+        max_length: int | None = None,
+    ) -> List[List[float]]:
+        """仅生成 Dense 向量；max_length 为空时使用模型默认截断长度"""
         if not texts:
             return []
-        output = self.model.encode(
-            texts,
-            return_dense=True,
-            return_sparse=False,
-            batch_size=batch_size,
-        )
-        return output["dense_vecs"].tolist()
+        return self._encode_dense_array(texts, batch_size, max_length).tolist()
+
+    def _encode_dense_array(
+        self,
+        texts: List[str],
+        batch_size: int = 12,
+        max_length: int | None = None,
+    ) -> np.ndarray:
+        """Dense 向量的 float32 矩阵，可直接传给 Milvus，省去逐元素转 Python float"""
+        kwargs = {"max_length": max_length} if max_length else {}
+        with _encode_lock, torch.inference_mode():
+            output = self.model.encode(
+                texts,
+                return_dense=True,
+                return_sparse=False,
+                batch_size=batch_size,
+                **kwargs,
+            )
+        # FP16 推理时输出为 float16，FLOAT_VECTOR 字段需要 float32
+        return output["dense_vecs"].astype(np.float32, copy=False)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """为单条查询生成 Dense 向量（float32 一维数组）；并发请求经后台线程合并为一批编码"""
+        batcher = _query_batchers.get(id(self.model))
+        if batcher is None:
+            with _query_batcher_lock:
+                batcher = _query_batchers.get(id(self.model))
+                if batcher is None:
+                    batcher = _QueryBatcher(
+                        lambda texts: self._encode_dense_array(
+                            texts, batch_size=len(texts), max_length=self.QUERY_MAX_LENGTH
+                        )
+                    )
+                    _query_batchers[id(self.model)] = batcher
+        return batcher.submit(text)
 
     def encode_hybrid(self, texts: List[str], batch_size: int = 12):
         """同时生成 Dense + Sparse 向量
@@ -53,21 +140,24 @@ class BGEM3Embedder:
         """
         if not texts:
             return [], []
-        output = self.model.encode(
-            texts,
-            return_dense=True,
-            return_sparse=True,
-            batch_size=batch_size,
-        )
+        with _encode_lock, torch.inference_mode():
+            output = self.model.encode(
+                texts,
+                return_dense=True,
+                return_sparse=True,
+                batch_size=batch_size,
+            )
         dense = output["dense_vecs"].tolist()
         sparse = output["lexical_weights"]
         return dense, sparse
 
     def encode_sparse_query(self, text: str) -> Dict[int, float]:
         """为查询生成 Sparse 向量"""
-        output = self.model.encode(
-            [text],
-            return_sparse=True,
-            return_dense=False,
-        )
+        with _encode_lock, torch.inference_mode():
+            output = self.model.encode(
+                [text],
+                return_sparse=True,
+                return_dense=False,
+                max_length=self.QUERY_MAX_LENGTH,
+            )
         return output["lexical_weights"][0]
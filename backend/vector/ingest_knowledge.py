@@ -58,9 +58,6 @@ def ingest_knowledge_chunks(
     Returns:
         {"inserted": count}
     """
-    if embedder is None:
-        embedder = BGEM3Embedder()
-
     if chunks is None:
         if chunks_path is None:
             chunks_path = str(
@@ -99,6 +96,14 @@ def ingest_knowledge_chunks(
             "filename": filename,
         })
 
+    if not contents:
+        print("[ingest_knowledge] 无有效 content 可入库")
+        return {"inserted": 0}
+
+    # 确认有数据后再加载模型
+    if embedder is None:
+        embedder = BGEM3Embedder()
+
     print(f"[ingest_knowledge] 向量化 {len(contents)} 个 content...")
     dense_vecs, sparse_vecs = embedder.encode_hybrid(contents)
 
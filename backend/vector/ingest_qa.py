@@ -37,9 +37,6 @@ def ingest_qa_from_csv(
     Returns:
         {"inserted": count}
     """
-    if embedder is None:
-        embedder = BGEM3Embedder()
-
     cfg = MilvusLiteConfig()
 
     df = pd.read_csv(csv_path)
@@ -71,6 +68,14 @@ def ingest_qa_from_csv(
             "department": department,
         })
 
+    if not rows:
+        print("[ingest_qa] 无数据可入库")
+        return {"inserted": 0}
+
+    # 确认有数据后再加载模型
+    if embedder is None:
+        embedder = BGEM3Embedder()
+
     # 向量化 summary (Dense only — for summary_dense field)
     print(f"[ingest_qa] 向量化 {len(summary_texts)} 个 summary...")
     summary_dense = embedder.encode_dense(summary_texts)
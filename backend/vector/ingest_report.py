@@ -65,9 +65,6 @@ def ingest_checkup_report(
     Returns:
         {"pages": count, "items": count}
     """
-    if embedder is None:
-        embedder = BGEM3Embedder()
-
     cfg = MilvusLiteConfig()
     pages_data = []
     items_data = []
@@ -128,6 +125,14 @@ def ingest_checkup_report(
                         "reference_range": titem.reference_range or "",
                     })
 
+    if not pages_data:
+        print("[ingest_report] 无页面可入库")
+        return {"pages": 0, "items": 0}
+
+    # 确认有数据后再加载模型
+    if embedder is None:
+        embedder = BGEM3Embedder()
+
     # ===== 批量向量化 =====
     print(f"[ingest_report] 向量化 {len(summaries)} 个 summary...")
     summary_dense, summary_sparse = embedder.encode_hybrid(summaries)
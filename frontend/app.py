@@ -5,12 +5,26 @@ Chainlit Frontend for CheckupAI
 
 import chainlit as cl
 import aiohttp
+import json
 import os
 
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 MESSAGES_KEY = "chat_messages"
 MAX_HISTORY_ROUNDS = 6  # 最近 3 轮对话
 
+# 所有会话共用一个连接池，复用到后端的 keep-alive 连接
+_session: aiohttp.ClientSession | None = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """获取共享的 HTTP 会话（首次调用时在当前事件循环中创建）"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+        )
+    return _session
+
 
 @cl.on_chat_start
 async def start():
@@ -49,38 +63,73 @@ async def main(message: cl.Message):
     await thinking_msg.send()
 
     report_mode = cl.user_session.get("report_mode", False)
-    endpoint = "/api/report" if report_mode else "/api/chat"
+    endpoint = "/api/report/stream" if report_mode else "/api/chat/stream"
 
     messages = cl.user_session.get(MESSAGES_KEY, [])
     history = _format_history(messages)
 
+    answer_msg = cl.Message(content="")
+    answer_parts = []
+    retrieval = {}
+
     try:
-        async with aiohttp.ClientSession() as session:
-            payload = {"question": question, "history": history}
-            async with session.post(
-                f"{API_URL}{endpoint}", json=payload
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    answer = result.get("answer", "")
-                    retrieval = result.get("retrieval", {})
-
-                    # 追加到历史
-                    messages.append({"role": "用户", "content": question})
-                    messages.append({"role": "助手", "content": answer})
-                    cl.user_session.set(MESSAGES_KEY, messages)
-
-                    formatted = _format_response(answer, retrieval, report_mode)
-                    await cl.Message(content=formatted).send()
-                else:
-                    error = await resp.text()
-                    await cl.Message(content=f"请求失败 ({resp.status}): {error}").send()
+        payload = {"question": question, "history": history}
+        async with _get_session().post(
+            f"{API_URL}{endpoint}", json=payload
+        ) as resp:
+            if resp.status != 200:
+                error = await resp.text()
+                await cl.Message(content=f"请求失败 ({resp.status}): {error}").send()
+                return
+
+            # SSE：retrieval → 多个回答增量 → done / error
+            async for event, data in _iter_sse(resp):
+                if event == "retrieval":
+                    retrieval = data
+                elif event == "error":
+                    await cl.Message(content=f"请求出错: {data.get('detail', '')}").send()
+                    return
+                elif event == "done":
+                    break
+                elif "delta" in data:
+                    answer_parts.append(data["delta"])
+                    await answer_msg.stream_token(data["delta"])
+
+        answer = "".join(answer_parts)
+
+        # 追加到历史
+        messages.append({"role": "用户", "content": question})
+        messages.append({"role": "助手", "content": answer})
+        cl.user_session.set(MESSAGES_KEY, messages)
+
+        answer_msg.content = _format_response(answer, retrieval, report_mode)
+        if answer_parts:
+            await answer_msg.update()
+        else:
+            await answer_msg.send()
     except Exception as e:
         await cl.Message(content=f"请求出错: {str(e)}").send()
     finally:
         await thinking_msg.remove()
 
 
+async def _iter_sse(resp: aiohttp.ClientResponse):
+    """按空行切分 SSE 事件，产出 (event, data)；按字节缓冲，避免长事件触发行长度限制"""
+    buffer = b""
+    async for chunk in resp.content.iter_any():
+        buffer += chunk
+        while b"\n\n" in buffer:
+            raw_event, buffer = buffer.split(b"\n\n", 1)
+            event, data_lines = "message", []
+            for line in raw_event.decode("utf-8").splitlines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[len("data:"):].strip())
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+
+
 def _format_history(messages: list[dict]) -> str:
     if not messages:
         return ""
@@ -338,6 +338,68 @@ def test_html_entities():
     return True
 
 
+def test_escape_sequences():
+    """测试单元格中的转义序列在解析时直接替换"""
+    html = r'''
+    <table>
+    <tr>
+        <td>项目</td><td>结果</td><td>单位</td>
+    </tr>
+    <tr>
+        <td>白细胞</td><td>\uparrow 11.2</td><td>10^9/L</td>
+    </tr>
+    <tr>
+        <td>红细胞</td><td>\downarrow 3.1</td><td>10\times 12/L</td>
+    </tr>
+    </table>
+    '''
+
+    result = table_html_to_md(html)
+
+    print("\n=== 测试：转义序列替换 ===")
+    assert result is not None
+
+    matrix = result['tables'][0]['matrix']
+    print(f"矩阵：{matrix}")
+
+    assert ['白细胞', '↑ 11.2', '10^9/L'] in matrix
+    assert ['红细胞', '↓ 3.1', '10 × 12/L'] in matrix
+
+    print("[PASS]\n")
+    return True
+
+
+def test_malformed_span():
+    """测试不规范的 rowspan/colspan 属性（非数字、带后缀、为 0）"""
+    html = '''
+    <table>
+    <tr>
+        <td>项目</td><td>结果</td><td>单位</td>
+    </tr>
+    <tr>
+        <td rowspan="2;">白细胞</td><td colspan="">6.5</td><td colspan="abc">10^9/L</td>
+    </tr>
+    <tr>
+        <td rowspan="0">7.1</td><td>10^9/L</td>
+    </tr>
+    </table>
+    '''
+
+    result = table_html_to_md(html)
+
+    print("\n=== 测试：不规范 span 属性 ===")
+    assert result is not None
+
+    matrix = result['tables'][0]['matrix']
+    print(f"矩阵：{matrix}")
+
+    assert matrix[1] == ['白细胞', '6.5', '10^9/L']
+    assert matrix[2] == ['白细胞', '7.1', '10^9/L']
+
+    print("[PASS]\n")
+    return True
+
+
 def test_empty_input():
     """测试空输入"""
     print("\n=== 测试：空输入 ===")
@@ -369,6 +431,8 @@ if __name__ == '__main__':
         ("复杂 rowspan+colspan", test_complex_rowspan_colspan),
         ("footer 行识别", test_footer_row),
         ("HTML 实体解码", test_html_entities),
+        ("转义序列替换", test_escape_sequences),
+        ("不规范 span 属性", test_malformed_span),
         ("空输入", test_empty_input),
         ("无效 HTML", test_invalid_html),
     ]
@@ -0,0 +1,88 @@
+"""
+测试 SemanticCache — 语义回答缓存
+"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+# 直接按文件加载 cache 模块：backend.rag 包初始化会加载 reranker / retriever，
+# 而 SemanticCache 只依赖 numpy
+_CACHE_PATH = Path(__file__).parent.parent.parent / "backend" / "rag" / "cache.py"
+_spec = importlib.util.spec_from_file_location("semantic_cache_under_test", _CACHE_PATH)
+_cache_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_cache_module)
+SemanticCache = _cache_module.SemanticCache
+
+
+def _unit(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_exact_hit():
+    """原文完全一致直接命中"""
+    cache = SemanticCache(threshold=0.99)
+    cache.put("血压高怎么办", _unit([1, 0, 0]), "answer")
+    assert cache.get("血压高怎么办", _unit([0, 1, 0])) == "answer"
+
+
+def test_semantic_hit_and_miss():
+    """相似度超过阈值命中，否则未命中"""
+    cache = SemanticCache(threshold=0.9)
+    cache.put("血压高怎么办", _unit([1, 0, 0]), "answer")
+
+    assert cache.get("高血压怎么办", _unit([1, 0.1, 0])) == "answer"
+    assert cache.get("血糖高怎么办", _unit([0, 1, 0])) is None
+
+
+def test_empty_cache():
+    """空缓存返回 None"""
+    cache = SemanticCache()
+    assert cache.get("任意问题", _unit([1, 0, 0])) is None
+
+
+def test_lru_eviction():
+    """超出容量淘汰最久未使用条目"""
+    cache = SemanticCache(threshold=0.99, max_size=2)
+    cache.put("a", _unit([1, 0, 0]), "A")
+    cache.put("b", _unit([0, 1, 0]), "B")
+    cache.get("a", _unit([1, 0, 0]))  # a 变为最近使用
+    cache.put("c", _unit([0, 0, 1]), "C")
+
+    assert len(cache) == 2
+    assert cache.get("b", _unit([0, 1, 0])) is None
+    assert cache.get("a", _unit([1, 0, 0])) == "A"
+    assert cache.get("c", _unit([0, 0, 1])) == "C"
+
+
+def test_near_antonym_not_hit_at_strict_threshold():
+    """近义反义问题（血压高/血压低）向量高度相似：宽松阈值会误命中，严格阈值下不命中"""
+    high = _unit([1, 0, 0])
+    low = _unit([1, 0.33, 0])  # 余弦约 0.95
+    assert 0.92 < float(high @ low) < 0.98
+
+    loose = SemanticCache(threshold=0.92)
+    loose.put("血压高怎么办", high, "高血压回答")
+    assert loose.get("血压低怎么办", low) == "高血压回答"
+
+    strict = SemanticCache(threshold=0.98)
+    strict.put("血压高怎么办", high, "高血压回答")
+    assert strict.get("血压低怎么办", low) is None
+
+
+def test_ttl_expiry(monkeypatch):
+    """超过 ttl_seconds 的条目视为过期并被删除"""
+    now = [1000.0]
+    monkeypatch.setattr(_cache_module.time, "monotonic", lambda: now[0])
+
+    cache = SemanticCache(threshold=0.9, ttl_seconds=60)
+    cache.put("血压高怎么办", _unit([1, 0, 0]), "answer")
+
+    now[0] += 30
+    assert cache.get("血压高怎么办", _unit([1, 0, 0])) == "answer"
+
+    now[0] += 31
+    assert cache.get("高血压怎么办", _unit([1, 0.1, 0])) is None
+    assert len(cache) == 0